@@ -0,0 +1,61 @@
+################################################################################################################
+# Benchmark for the historical backtest: loads a generated price file and replays an equal-weight allocation
+# with every rebalance frequency, with and without drift bands.
+#
+# Usage: python benchmarks/bench_backtest.py [--years 10] [--symbols 500]
+################################################################################################################
+
+
+import os
+import csv
+import time
+import argparse
+import tempfile
+import numpy as np
+from robinhood_portfolio_manager import backtest
+
+
+def generate(path, years, size, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64("2010-01-04"), np.datetime64("2010-01-04") + int(years * 365.25))
+    dates = dates[np.is_busday(dates)]
+    returns = rng.normal(0.0003, 0.02, (len(dates), size))
+    prices = 50 * np.exp(np.cumsum(returns, axis=0))
+    # Some symbols list part way through the period.
+    for column in rng.choice(size, size // 20, replace=False):
+        prices[:rng.integers(1, len(dates) // 2), column] = np.nan
+
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Date"] + [f"S{index}" for index in range(size)])
+        for date, row in zip(dates.astype(str), prices):
+            writer.writerow([date] + ["" if np.isnan(value) else f"{value:.4f}" for value in row])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--symbols", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prices.csv")
+        generate(path, args.years, args.symbols)
+
+        start = time.perf_counter()
+        prices = backtest.load_prices(path)
+        print(f"load {prices.values.shape[0]} days x {prices.values.shape[1]} symbols: {time.perf_counter() - start:.3f}s ({os.path.getsize(path) / 1024 / 1024:.1f} MB CSV)")
+
+    allocation = {symbol: 1 / len(prices.symbols) for symbol in prices.symbols}
+    print(f"{'frequency':<12}{'bands':<18}{'seconds':>9}{'orders':>10}{'return %':>10}{'drawdown %':>12}")
+
+    for frequency in backtest.FREQUENCIES:
+        for name, bands in (("none", {}), ("25% / $5 min", {"relative_band": 0.25, "min_trade": 5.0})):
+            start = time.perf_counter()
+            result = backtest.run(allocation, prices, 100000.0, frequency, **bands)
+            elapsed = time.perf_counter() - start
+            print(f"{frequency:<12}{name:<18}{elapsed:>9.3f}{result.order_count:>10}{result.total_return * 100:>10.1f}{result.max_drawdown * 100:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
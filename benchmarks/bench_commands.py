@@ -0,0 +1,96 @@
+################################################################################################################
+# End-to-end benchmark of the CLI commands against the fake Robinhood backend.
+#
+# Usage: python benchmarks/bench_commands.py [--sizes 10 100 1000] [--latency 0.0] [--data recorded.json]
+################################################################################################################
+
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import openpyxl
+from robinhood_portfolio_manager import fake
+from robinhood_portfolio_manager import Robinhood
+
+
+COMMANDS = [
+    ("-o get_current_investments", lambda robinhood: robinhood.get_current_investments()),
+    ("-n get_new_investments", lambda robinhood: robinhood.get_new_investments()),
+    ("-a cancel_open_orders all", lambda robinhood: robinhood.cancel_open_orders("all")),
+    ("-p sell_all_stocks", lambda robinhood: robinhood.sell_all_stocks()),
+    ("-r rebalance_old", lambda robinhood: robinhood.rebalance_old()),
+]
+
+
+def write_allocation(path, symbols):
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.append(["Symbol", "Percentage"])
+
+    for symbol in symbols:
+        worksheet.append([symbol, 1 / len(symbols)])
+
+    worksheet.append(["Total", f"=SUM(B2:B{len(symbols) + 1})"])
+    workbook.save(path)
+
+
+def quiet():
+    for handler in logging.getLogger("robinhood_portfolio_manager").handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setLevel(logging.WARNING)
+
+
+def bench(data, latency):
+    symbols = [item["symbol"] for item in data["watchlists"]["Portfolio"]["results"]]
+    write_allocation(os.path.join(os.environ["HOME"], "Robinhood.xlsx"), symbols)
+    robinhood = Robinhood.Robinhood(backend=fake.FakeBackend(data), username="bench", password="bench", totp="JBSWY3DPEHPK3PXP", rate_limit=100000, workers=8)
+    quiet()
+    robinhood.rh
+    rows = []
+
+    for name, command in COMMANDS:
+        robinhood.cache.clear()
+
+        for cache in ("cold", "warm"):
+            robinhood.rh = fake.FakeBackend(data, latency=latency)
+            robinhood._snapshot = None
+            start = time.perf_counter()
+            command(robinhood)
+            elapsed = time.perf_counter() - start
+            calls = robinhood.rh.calls
+            top = ", ".join(f"{call}={count}" for call, count in calls.most_common(3))
+            rows.append((name, cache, elapsed, robinhood.rh.call_count, top))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000], help="Portfolio sizes to benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency of every API call in seconds")
+    parser.add_argument("--data", help="Replay a file written by fake.record() instead of generated portfolios")
+    args = parser.parse_args()
+
+    datasets = []
+    if args.data:
+        backend = fake.FakeBackend.from_file(args.data)
+        datasets.append((len(backend.data["positions"]), backend.data))
+    else:
+        datasets.extend((size, fake.generate(positions=size, open_orders=size)) for size in args.sizes)
+
+    print(f"{'command':<28}{'positions':>10}{'cache':>7}{'wall ms':>12}{'api calls':>11}  top calls")
+
+    for size, data in datasets:
+        with tempfile.TemporaryDirectory() as home:
+            os.environ["HOME"] = home
+            for name, cache, elapsed, count, top in bench(data, args.latency):
+                print(f"{name:<28}{size:>10}{cache:>7}{elapsed * 1000:>12.1f}{count:>11}  {top}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+################################################################################################################
+# Time to first order of a full rebalance against executing a prepared plan, on the fake Robinhood backend.
+#
+# Usage: python benchmarks/bench_execute.py [--sizes 10 100 500] [--latency 0.05]
+################################################################################################################
+
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from robinhood_portfolio_manager import fake
+from robinhood_portfolio_manager import Robinhood
+
+
+def quiet():
+    for handler in logging.getLogger("robinhood_portfolio_manager").handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setLevel(logging.WARNING)
+
+
+def first_order(command):
+    start = time.monotonic()
+    results = command()
+    return (min(result.finished for result in results) - start) * 1000, len(results)
+
+
+def bench(data, latency):
+    symbols = [item["symbol"] for item in data["watchlists"]["Portfolio"]["results"]]
+
+    with open(os.path.join(os.environ["HOME"], "Robinhood.csv"), "w") as file:
+        file.write("Symbol,Percentage\n")
+        file.writelines(f"{symbol},{100 / len(symbols)}\n" for symbol in symbols)
+
+    def robinhood():
+        # A new instance per run, so nothing is left over from the previous command but the instrument cache.
+        instance = Robinhood.Robinhood(backend=fake.FakeBackend(data, latency=latency), username="bench", password="bench", totp="JBSWY3DPEHPK3PXP", store_session=False, rate_limit=100000, workers=8)
+        quiet()
+        return instance
+
+    rebalance = robinhood()
+    rows = [("-r rebalance_old", *first_order(rebalance.rebalance_old))]
+
+    robinhood().prepare_plan()
+    execute = robinhood()
+    rows.append(("execute", *first_order(execute.execute_plan)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 500], help="Portfolio sizes to benchmark")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated latency of every API call in seconds")
+    args = parser.parse_args()
+
+    print(f"{'command':<20}{'positions':>10}{'orders':>8}{'ms to first order':>19}")
+
+    for size in args.sizes:
+        data = fake.generate(positions=size, watchlist=size)
+
+        with tempfile.TemporaryDirectory() as home:
+            os.environ["HOME"] = home
+            for name, elapsed, count in bench(data, args.latency):
+                print(f"{name:<20}{size:>10}{count:>8}{elapsed:>19.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+################################################################################################################
+# Microbenchmark for the rebalance planner.
+#
+# Usage: python benchmarks/bench_planner.py [symbols ...]
+################################################################################################################
+
+
+import sys
+import time
+import numpy as np
+from robinhood_portfolio_manager import planner
+
+
+def bench(size, repeat=20):
+    rng = np.random.default_rng(0)
+    symbols = [f"S{index}" for index in range(size)]
+    weights = rng.random(size)
+    weights /= weights.sum()
+    weights[rng.random(size) < 0.05] = np.nan
+    prices = rng.uniform(1, 500, size)
+    shares = rng.uniform(0, 50, size)
+    equity = prices * shares
+    margin_ratios = rng.choice([0.25, 0.5, 1.0], size)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        plan = planner.plan(symbols, weights, equity, shares, prices, margin_ratios, 1000.0, float(equity.sum()))
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    sells, buys = plan.sells, plan.buys
+    orders = time.perf_counter() - start
+
+    print(f"{size:>7} symbols  plan: {min(timings) * 1000:8.3f} ms (best of {repeat})  orders: {orders * 1000:8.3f} ms  ({len(sells)} sells, {len(buys)} buys)")
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 100000]:
+        bench(size)
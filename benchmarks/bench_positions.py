@@ -0,0 +1,74 @@
+################################################################################################################
+# Compares the Positions container with the dict of dicts get_current_investments used to return: memory held
+# and the time of the operations the commands run on it.
+#
+# Usage: python benchmarks/bench_positions.py [positions ...]
+################################################################################################################
+
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+from robinhood_portfolio_manager import positions
+
+
+def as_dicts(symbols, available_shares, collateral_shares, prices, market_value):
+    investments = {}
+
+    for symbol, available, collateral, price in zip(symbols, available_shares, collateral_shares, prices):
+        equity = (price * available) + (price * collateral)
+        investments[symbol] = {"equity": equity, "percentage": round((equity / market_value) * 100, 2), "available_shares": available, "collateral_shares": collateral, "price": price}
+
+    return investments
+
+
+def measure(function, repeat=5):
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    return result, min(timings) * 1000
+
+
+def allocated(function):
+    tracemalloc.start()
+    result = function()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def bench(size):
+    rng = np.random.default_rng(0)
+    symbols = [f"S{index}" for index in range(size)]
+    available_shares = rng.uniform(0, 100, size).tolist()
+    collateral_shares = np.where(rng.random(size) < 0.01, 1.0, 0.0).tolist()
+    prices = rng.uniform(1, 500, size).tolist()
+    market_value = float(np.dot(prices, np.add(available_shares, collateral_shares)))
+
+    dicts, dict_bytes = allocated(lambda: as_dicts(symbols, available_shares, collateral_shares, prices, market_value))
+    table, table_bytes = allocated(lambda: positions.Positions(symbols, available_shares, collateral_shares, prices, market_value))
+
+    print(f"{size} positions: dict of dicts {dict_bytes / 1024:.0f} kB, Positions {table_bytes / 1024:.0f} kB (symbol strings shared)")
+    print(f"{'operation':<24}{'dicts ms':>10}{'Positions ms':>14}")
+
+    operations = [
+        ("build", lambda: as_dicts(symbols, available_shares, collateral_shares, prices, market_value), lambda: positions.Positions(symbols, available_shares, collateral_shares, prices, market_value)),
+        ("total equity", lambda: sum(data["equity"] for data in dicts.values()), lambda: table.total_equity),
+        ("weights", lambda: {symbol: data["equity"] / market_value for symbol, data in dicts.items()}, lambda: table.weights),
+        ("collateral check", lambda: any(data["collateral_shares"] for data in dicts.values()), lambda: table.has_collateral),
+        ("sellable symbols", lambda: [symbol for symbol, data in dicts.items() if data["available_shares"]], lambda: [table.symbols[index] for index in table.available_shares.nonzero()[0].tolist()]),
+        ("dict view", lambda: dict(dicts), lambda: dict(table)),
+    ]
+
+    for name, old, new in operations:
+        print(f"{name:<24}{measure(old)[1]:>10.3f}{measure(new)[1]:>14.3f}")
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or [10000]:
+        bench(size)
@@ -0,0 +1,106 @@
+################################################################################################################
+# CLI start-up benchmark based on `python -X importtime`.
+#
+# Every command is run in a fresh interpreter with an empty home folder holding only an allocation file. The
+# cumulative import time of the modules imported by the CLI is compared against the command's budget, and the heavy
+# packages that command must not load are checked.
+#
+# Usage: python benchmarks/bench_startup.py [--repeat 5]
+################################################################################################################
+
+
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+
+HEAVY = ("openpyxl", "robin_stocks", "pyotp", "numpy", "cryptography")
+
+# (name, arguments, allocation file, import budget in ms, heavy packages allowed)
+COMMANDS = [
+    ("ropoma -h", ["-h"], None, 20, ()),
+    ("ropoma (no arguments)", [], None, 20, ()),
+    ("ropoma -n (csv)", ["-n"], "csv", 60, ()),
+    # Answered by a running `ropoma serve`, the client only loads the socket code.
+    ("ropoma send report", ["send", "report"], None, 30, ()),
+    # openpyxl imports numpy on its own when it is installed.
+    ("ropoma -n (excel)", ["-n"], "excel", 400, ("openpyxl", "numpy")),
+]
+
+SCRIPT = "import sys; sys.argv = ['ropoma'] + sys.argv[1:]; from robinhood_portfolio_manager import main; main()"
+
+
+def write_allocation(home, kind):
+    if kind == "csv":
+        with open(os.path.join(home, "Robinhood.csv"), "w") as file:
+            file.write("Symbol,Percentage\nAAPL,50.00\nMSFT,50.00\n")
+    elif kind == "excel":
+        import openpyxl
+
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        for row in (["Symbol", "Percentage"], ["AAPL", 0.5], ["MSFT", 0.5], ["Total", "=SUM(B2:B3)"]):
+            worksheet.append(row)
+        workbook.save(os.path.join(home, "Robinhood.xlsx"))
+
+
+def parse_importtime(stderr):
+    total = 0
+    modules = set()
+    started = False
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+
+        # Interpreter start-up (site, .pth files) is imported before the package and isn't counted. Nested imports
+        # are indented below their parent, only top level imports are added up.
+        started = started or name.strip() == "robinhood_portfolio_manager"
+        if started and not name[1:].startswith(" "):
+            total += int(cumulative)
+
+    return total / 1000, modules
+
+
+def run(arguments, kind, repeat):
+    timings = []
+
+    with tempfile.TemporaryDirectory() as home:
+        write_allocation(home, kind)
+        env = {key: value for key, value in os.environ.items() if not key.startswith("ROBINHOOD_")}
+        env["HOME"] = home
+
+        for _ in range(repeat):
+            process = subprocess.run([sys.executable, "-X", "importtime", "-c", SCRIPT] + arguments, env=env, capture_output=True, text=True)
+            total, modules = parse_importtime(process.stderr)
+            timings.append(total)
+
+    return min(timings), modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command, the fastest is reported")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'command':<24}{'imports ms':>12}{'budget ms':>11}  heavy packages loaded")
+
+    for name, arguments, kind, budget, allowed in COMMANDS:
+        total, modules = run(arguments, kind, args.repeat)
+        loaded = [package for package in HEAVY if package in modules]
+        unexpected = [package for package in loaded if package not in allowed]
+        status = "FAIL" if total > budget or unexpected else "ok"
+        failed = failed or status == "FAIL"
+        print(f"{name:<24}{total:>12.1f}{budget:>11}  {', '.join(loaded) or '-'}  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
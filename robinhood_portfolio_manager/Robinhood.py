@@ -15,166 +15,238 @@
 
 import os
 import csv
+import math
 import time
-import pyotp
 import logging
+import collections
+import concurrent.futures
 import pathlib
 import platform
-import openpyxl
-import openpyxl.styles
-import robin_stocks.robinhood as rh
+from . import cache
+from . import utils
+from . import snapshot
+from . import tracker
+from . import metrics
+from . import logs
+from . import allocation
+from . import session
+from . import orders
+from . import paper
+from . import plans
+
+# openpyxl, pyotp, robin_stocks and numpy (through planner and positions) are imported where they are used so that
+# `ropoma -h` and CSV-only commands start without loading them.
+
+
+BATCH_SIZE = 75
+ORDER_OPTIONS = {"timeInForce": "gfd", "extendedHours": True, "jsonify": False}
+CLOCK_SKEW = 5
 
 
 class Robinhood(object):
 
     def __init__(self, **kwargs):
         self.logger = self._configure_logger()
+        self.metrics = metrics.Metrics()
+        self.backend = None
+        self.rh = kwargs.get("backend")
+        self.login = None
+        self.tokens = None
+        self._cache = None
+        self._snapshot = None
+        self.snapshot_max_age = kwargs.get("snapshot_max_age")
+        self._tracker = None
+        self.paper = None
+        self.settle_timeout = kwargs.get("settle_timeout", 600)
+        self.absolute_band = kwargs.get("absolute_band", 0.0)
+        self.relative_band = kwargs.get("relative_band", 0.0)
+        self.min_trade = kwargs.get("min_trade", 0.0)
+        self.order_engine = orders.OrderEngine(rate_limit=kwargs.get("rate_limit", 1.0), workers=kwargs.get("workers", 4), metrics=self.metrics, find=self._find_placed_order)
+
+        self.username = kwargs["username"] if "username" in kwargs else os.getenv("ROBINHOOD_USERNAME")
+        self.password = kwargs["password"] if "password" in kwargs else os.getenv("ROBINHOOD_PASSWORD")
+        self.totp = kwargs["totp"] if "totp" in kwargs else os.getenv("ROBINHOOD_TOTP")
+        self.store_session = kwargs.get("store_session", True)
+        self.allocation_file = kwargs.get("allocation_file")
+        self.account_name = kwargs.get("account_name")
+
+
+    @property
+    def rh(self):
+        if self.backend is None:
+            import robin_stocks.robinhood as rh
+            self.rh = rh
+
+        if self.login is None:
+            self._login()
+
+        return self.backend
+
+
+    @rh.setter
+    def rh(self, backend):
+        self.backend = metrics.InstrumentedBackend(backend, self.metrics) if backend is not None else None
+
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = cache.InstrumentCache()
+
+        return self._cache
+
+
+    @property
+    def tracker(self):
+        if self._tracker is None:
+            self._tracker = tracker.OrderTracker(self.rh)
+
+        return self._tracker
+
+
+    def _get_broker(self, sim=False, prices=None):
+        if not sim:
+            return self.rh.orders
+
+        if self.paper is None:
+            # The simulated account starts from the snapshot and fills every order at the price it was planned with.
+            account = self.get_snapshot()
+            shares = collections.Counter()
+
+            for symbol, position in zip(self._get_position_symbols(account.positions), account.positions):
+                shares[symbol] += float(position["shares_available_for_exercise"])
+
+            self.paper = paper.PaperBroker(account.buying_power, shares, quote=self._get_latest_prices)
+
+        # Symbols planned without a price, the new buys, are quoted together instead of one order at a time.
+        prices = prices or {}
+        self.paper.prices.update({symbol: price for symbol, price in prices.items() if symbol not in self.paper.prices and price and not math.isnan(price)})
+        missing = [symbol for symbol in prices if symbol not in self.paper.prices]
+
+        if missing:
+            self.paper.prices.update(self._get_latest_prices(missing))
+
+        return self.paper
 
-        username = kwargs["username"] if "username" in kwargs else os.getenv("ROBINHOOD_USERNAME")
-        password = kwargs["password"] if "password" in kwargs else os.getenv("ROBINHOOD_PASSWORD")
-        totp = kwargs["totp"] if "totp" in kwargs else os.getenv("ROBINHOOD_TOTP")
 
-        if not all([username, password, totp]):
+    @metrics.timed
+    def _login(self):
+        if not all([self.username, self.password, self.totp]):
             message = "One or more environment variable(s) are not set. set ROBINHOOD_USERNAME, ROBINHOOD_PASSWORD, ROBINHOOD_TOTP variables or provide credentials through command line arguments."
             self._log(logging.ERROR, message)
             raise Exception(message)
 
-        totp = pyotp.TOTP(totp).now()
-        self.login = rh.authentication.login(username, password, store_session=False, mfa_code=totp)
+        store = session.SessionStore(self.username, self.password) if self.store_session else None
+        tokens = store.load() if store else None
 
+        if tokens and not session.is_fresh(tokens, session.REFRESH_MARGIN):
+            tokens = session.refresh(self.backend, tokens)
+        elif tokens and not session.is_valid(self.backend, tokens):
+            # Robinhood may revoke a token long before it expires.
+            self._log(logging.WARNING, "Stored session is no longer valid. Logging in again.")
+            tokens = None
 
-    def _configure_logger(self):
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.DEBUG)
-
-        file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        stream_formatter = logging.Formatter("%(message)s")
-        
-        if platform.system().lower() == "windows":
-            file_handler = logging.FileHandler(pathlib.Path.home().joinpath("Documents", "Robinhood.log"))
+        if session.is_fresh(tokens):
+            session.restore(self.backend, tokens)
+            self.login = tokens
         else:
-            file_handler = logging.FileHandler(pathlib.Path.home().joinpath("Robinhood.log"))
-        
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(file_formatter)
+            import pyotp
 
-        stream_handler = logging.StreamHandler()
-        stream_handler.setLevel(logging.DEBUG)
-        stream_handler.setFormatter(stream_formatter)
-        
-        logger.addHandler(file_handler)
-        logger.addHandler(stream_handler)
-        return logger
+            totp = pyotp.TOTP(self.totp).now()
+            tokens, data = session.login(self.backend, self.username, self.password, totp)
+            self.login = data or tokens or {}
+
+        self.tokens = tokens
+
+        if store and tokens:
+            store.save(tokens)
+
+
+    def _configure_logger(self):
+        logs.configure()
+        return logging.getLogger(__name__)
 
 
     def _log(self, level, message, sim=False):
+        if self.account_name:
+            message = f"[{self.account_name}] {message}"
+
         if sim:
             self.logger.log(level, "SIMULATION: " + message)
         else:
             self.logger.log(level, message)
 
 
-    def _check_list(self):
-        if platform.system().lower() == "windows":
-            xlsx_file = pathlib.Path.home().joinpath("Documents", "Robinhood.xlsx")
-        else:
-            xlsx_file = pathlib.Path.home().joinpath("Robinhood.xlsx")
+    def _find_allocation_file(self):
+        if self.allocation_file:
+            path = pathlib.Path(self.allocation_file)
+            return path if path.is_file() else None
 
-        if platform.system().lower() == "windows":
-            csv_file = pathlib.Path.home().joinpath("Documents", "Robinhood.csv")
-        else:
-            csv_file = pathlib.Path.home().joinpath("Robinhood.csv")
+        for name in ("Robinhood.xlsx", "Robinhood.csv"):
+            path = utils.get_file(name)
+            if path.is_file():
+                return path
 
-        if xlsx_file.is_file():
-            self._check_excel_list(xlsx_file)
-        elif csv_file.is_file():
-            self._check_csv_list(csv_file)
-        else:
-            message = "Excel/CSV file not found. Run generate_excel_file()."
-            self._log(logging.ERROR, message)
-            raise Exception(message)
+        return None
 
 
-    def _check_excel_list(self, xlsx_file):
-        wb_obj = openpyxl.load_workbook(xlsx_file)
-        sheet = wb_obj.active
-        max_row = len(sheet["A"]) - 1
-        
-        portfolio = rh.account.get_watchlist_by_name("Portfolio")
-        if not portfolio:
-            message = "Watchlist not found on Robinhood. Create 'Portfolio' watchlist."
+    def _get_allocation_file(self):
+        path = self._find_allocation_file()
+
+        if path is None:
+            message = f"Allocation file {self.allocation_file} not found." if self.allocation_file else "Excel/CSV file not found. Run generate_excel_file()."
             self._log(logging.ERROR, message)
             raise Exception(message)
 
-        excel_list = [row[0].value for row in sheet.iter_rows(min_row=2, max_row=max_row)]
-        portfolio_list = [instrument["symbol"] for instrument in portfolio["results"]]
-        diff = (set(excel_list) - set(portfolio_list)) | (set(portfolio_list) - set(excel_list))
+        return path
 
-        total_percent = sum([float(row[1].value) for row in sheet.iter_rows(min_row=2, max_row=max_row)])
 
-        if round(total_percent, 2) != 1:
-            message = "Total percentage doesn't add up to 100%. Check excel file."
-            self._log(logging.ERROR, message)
-            raise Exception(message)
-        elif diff:
-            message = "Excel file and Robinhood watchlist not in sync."
-            self._log(logging.ERROR, message)
-            raise Exception(message)
-        return True
+    def _load_allocation(self):
+        try:
+            return allocation.load(self._get_allocation_file())
+        except Exception as exception:
+            self._log(logging.ERROR, str(exception))
+            raise
 
 
-    def _check_csv_list(self, csv_file):
-        _list = []
+    def _check_list(self, max_age=None):
+        new_allocation = self._load_allocation()
+        portfolio = self.get_snapshot(max_age).watchlist
 
-        with open(csv_file, 'r') as file:
-            data = csv.reader(file)
-            for row in data:
-                if row:
-                    _list.append(row)
-        
-        portfolio = rh.account.get_watchlist_by_name("Portfolio")
-        
         if not portfolio:
             message = "Watchlist not found on Robinhood. Create 'Portfolio' watchlist."
             self._log(logging.ERROR, message)
             raise Exception(message)
 
-        csv_list = [row[0] for row in _list[1:]]
         portfolio_list = [instrument["symbol"] for instrument in portfolio["results"]]
-        diff = (set(csv_list) - set(portfolio_list)) | (set(portfolio_list) - set(csv_list))
-
-        total_percent = sum([float(row[1]) for row in _list[1:]])
+        diff = set(new_allocation.symbols) ^ set(portfolio_list)
 
-        if round(total_percent, 2) != 100:
-            print(total_percent)
-            message = "Total percentage doesn't add up to 100%. Check CSV file."
-            self._log(logging.ERROR, message)
-            raise Exception(message)
-        elif diff:
-            message = "CSV file and Robinhood watchlist not in sync."
+        if diff:
+            message = f"{'Excel' if new_allocation.kind == 'excel' else 'CSV'} file and Robinhood watchlist not in sync."
             self._log(logging.ERROR, message)
             raise Exception(message)
         return True
 
 
-    def _get_portfolio_value(self):
-        buying_power = float(rh.profiles.load_account_profile(info="buying_power"))
-        equity = rh.profiles.load_portfolio_profile(info="extended_hours_portfolio_equity")
+    @metrics.timed
+    def get_snapshot(self, max_age=None):
+        max_age = self.snapshot_max_age if max_age is None else max_age
 
-        if not equity:
-            equity = rh.profiles.load_portfolio_profile(info="equity")
+        if self._snapshot is None or (max_age is not None and self._snapshot.age > max_age):
+            self._snapshot = snapshot.fetch(self.rh)
 
-        return float(equity) + buying_power
+        return self._snapshot
 
 
-    def _check_if_collateral(self):
-        for instrument in self.get_current_investments.values():
-            if instrument["collateral_shares"]:
-                return True
+    def _get_portfolio_value(self, max_age=None):
+        return self.get_snapshot(max_age).portfolio_value
 
-        return False
 
+    def _check_if_collateral(self):
+        return self.get_current_investments().has_collateral
 
+
+    @metrics.timed
     def generate_excel_file(self):
         if platform.system().lower() == "windows":
             xlsx_file = pathlib.Path.home().joinpath("Documents", "Robinhood.xlsx")
@@ -186,8 +258,11 @@ class Robinhood(object):
             self._log(logging.ERROR, message)
             raise Exception(message)
 
-        portfolio_list = rh.account.get_watchlist_by_name("Portfolio")["results"]
-        
+        portfolio_list = self.get_snapshot().watchlist["results"]
+
+        import openpyxl
+        import openpyxl.styles
+
         workbook = openpyxl.Workbook()
         worksheet = workbook.active
         worksheet.title = "Portfolio"
@@ -218,6 +293,7 @@ class Robinhood(object):
         self._log(logging.INFO, "Excel file generated. Configure percentages for each stock.")
 
 
+    @metrics.timed
     def generate_csv_file(self):
         if platform.system().lower() == "windows":
             csv_file = pathlib.Path.home().joinpath("Documents", "Robinhood.csv")
@@ -229,7 +305,7 @@ class Robinhood(object):
             self._log(logging.ERROR, message)
             raise Exception(message)
 
-        portfolio_list = rh.account.get_watchlist_by_name("Portfolio")["results"]
+        portfolio_list = self.get_snapshot().watchlist["results"]
 
         rows = [[instrument["symbol"], "0.00"] for instrument in portfolio_list]
         with open(csv_file, "w") as file:
@@ -240,167 +316,428 @@ class Robinhood(object):
         self._log(logging.INFO, "CSV file generated. Configure percentages for each stock.")
 
 
-    def get_current_investments(self):
-        market_value = rh.profiles.load_portfolio_profile("extended_hours_market_value")
-        if not market_value:
-            market_value = rh.profiles.load_portfolio_profile("market_value")
+    def _fetch_instruments(self, urls):
+        instruments = []
+        ids = [url.rstrip("/").split("/")[-1] for url in urls]
+
+        for index in range(0, len(ids), BATCH_SIZE):
+            batch = ids[index:index + BATCH_SIZE]
+            results = self.rh.helper.request_get(self.rh.urls.instruments_url(), "results", {"ids": ",".join(batch)})
+            instruments.extend(instrument for instrument in results or [] if instrument)
+
+        self.cache.update(instruments)
+        return instruments
+
+
+    def _get_quotes(self, symbols):
+        quotes = []
+
+        for index in range(0, len(symbols), BATCH_SIZE):
+            results = self.rh.stocks.get_quotes(symbols[index:index + BATCH_SIZE])
+            quotes.extend(quote for quote in results or [] if quote)
+
+        return quotes
+
+
+    def _get_symbols_by_url(self, urls):
+        symbols = self.cache.get_symbols(urls)
+        missing = [url for url in dict.fromkeys(urls) if url not in symbols]
+
+        if missing:
+            symbols.update({instrument["url"]: instrument["symbol"] for instrument in self._fetch_instruments(missing)})
+
+        return symbols
+
+
+    def _get_urls_by_symbol(self, symbols):
+        urls = self.cache.get_urls(symbols)
+        missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in urls]
+
+        if missing:
+            urls.update({quote["symbol"]: quote["instrument"] for quote in self._get_quotes(missing)})
+
+        return urls
+
+
+    def _get_margin_ratios(self, symbols):
+        margin_ratios = self.cache.get_margin_ratios(symbols)
+        missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in margin_ratios]
+
+        if missing:
+            urls = self._get_urls_by_symbol(missing)
+            instruments = self._fetch_instruments([urls[symbol] for symbol in missing if symbol in urls])
+            margin_ratios.update({instrument["symbol"]: float(instrument["margin_initial_ratio"]) for instrument in instruments if instrument.get("margin_initial_ratio") is not None})
+
+        return margin_ratios
+
+
+    def _get_latest_prices(self, symbols):
+        prices = {}
+
+        for quote in self._get_quotes(symbols):
+            price = quote["last_extended_hours_trade_price"] or quote["last_trade_price"]
+            prices[quote["symbol"]] = float(price)
+
+        return prices
+
+
+    def _get_position_symbols(self, positions):
+        unresolved = [position["instrument"] for position in positions if not position.get("symbol")]
+        symbols = self._get_symbols_by_url(unresolved) if unresolved else {}
+        return [position.get("symbol") or symbols[position["instrument"]] for position in positions]
 
-        if not float(market_value):
-            return {}
 
-        market_value = float(market_value)
-        positions = rh.account.get_open_stock_positions()
-        current_investments = {}
+    def _get_investments(self, account, position_symbols, prices, repriced=False):
+        from . import positions
 
-        for position in positions:
-            symbol = rh.stocks.get_instrument_by_url(position["instrument"], info="symbol")
-            available_shares = float(position["shares_available_for_exercise"])
-            collateral_shares = float(position["shares_held_for_options_collateral"])
-            current_price = float(rh.stocks.get_latest_price(symbol)[0])
-            equity = (current_price * available_shares) + (current_price * collateral_shares)
-            percentage = (equity / market_value) * 100
-            current_investments[symbol] = {"equity": equity, "percentage": round(percentage, 2), "available_shares": available_shares, "collateral_shares": collateral_shares}
+        if not account.market_value:
+            return positions.Positions()
 
-        return current_investments
+        # Prices newer than the snapshot make its market value stale, so the total is taken from the positions instead.
+        market_value = None if repriced else account.market_value
 
+        available_shares = [float(position["shares_available_for_exercise"]) for position in account.positions]
+        collateral_shares = [float(position["shares_held_for_options_collateral"]) for position in account.positions]
+        return positions.Positions(position_symbols, available_shares, collateral_shares, [prices[symbol] for symbol in position_symbols], market_value)
 
+
+    @metrics.timed
+    def get_current_investments(self, max_age=None):
+        account = self.get_snapshot(max_age)
+
+        if not account.market_value:
+            return self._get_investments(account, [], {})
+
+        position_symbols = self._get_position_symbols(account.positions)
+        prices = self._get_latest_prices(list(dict.fromkeys(position_symbols)))
+        return self._get_investments(account, position_symbols, prices)
+
+
+    @metrics.timed
     def get_new_investments(self):
-        if platform.system().lower() == "windows":
-            xlsx_file = pathlib.Path.home().joinpath("Documents", "Robinhood.xlsx")
-        else:
-            xlsx_file = pathlib.Path.home().joinpath("Robinhood.xlsx")
+        return self._load_allocation().as_dict()
+
+
+    @metrics.timed
+    def cancel_open_orders(self, side="all", sim=False, symbols=None, instruments=None, older_than=None):
+        open_orders = self.rh.orders.get_all_open_stock_orders() or []
+        urls = set(instruments or [])
+
+        if symbols:
+            urls.update(self._get_urls_by_symbol([symbol.upper() for symbol in symbols]).values())
+
+        # Every filter reads fields of the order itself, so orders that are kept cost no lookup.
+        now = time.time()
+        selected = [
+            order for order in open_orders
+            if (side == "all" or order["side"] == side)
+            and (not (symbols or instruments) or order["instrument"] in urls)
+            and (older_than is None or now - tracker.parse_timestamp(order["created_at"]) >= older_than)
+        ]
+
+        # Symbols are only used in log lines, so cancels go out with what the cache knows and the rest is looked up after.
+        names = self.cache.get_symbols([order["instrument"] for order in selected]) if selected else {}
+        # Nothing is filled by a cancel, so a simulated one needs no paper account.
+        cancel = paper.cancel_stock_order if sim else self.rh.orders.cancel_stock_order
+        cancels = [orders.Order(cancel, (order["id"],), {}, names.get(order["instrument"]), order["side"], None) for order in selected]
+
+        results = self.order_engine.run(cancels, sim)
+        missing = [order["instrument"] for order in selected if order["instrument"] not in names]
+        states = {}
+
+        if missing:
+            names.update(self._get_symbols_by_url(missing))
+
+        if any(not result.ok for result in results):
+            # One request tells orders that filled in the meantime apart from cancellations that really failed.
+            since = min(tracker.parse_timestamp(order["created_at"]) for order in selected)
+            states = {order["id"]: order.get("state") for order in tracker.fetch_orders(self.rh, since)}
+
+        summary = orders.CancelSummary([], [], [])
+
+        for order, result in zip(selected, results):
+            # Instruments Robinhood couldn't resolve are shown by id.
+            symbol = names.get(order["instrument"]) or order["instrument"].rstrip("/").split("/")[-1]
+            message = f"Cancelling {order['side']} order of {symbol}."
+            state = "cancelled" if result.ok else states.get(order["id"])
+            entry = {"id": order["id"], "symbol": symbol, "side": order["side"], "created_at": order["created_at"], "state": state, "error": result.error}
+            logs.audit("order_cancel", order_id=order["id"], symbol=symbol, side=order["side"], state=state, error=result.error, sim=sim)
+
+            if state == "cancelled":
+                summary.cancelled.append(entry)
+                self._log(logging.INFO, message, sim)
+            elif state == "filled":
+                summary.filled.append(entry)
+                self._log(logging.INFO, f"{order['side'].capitalize()} order of {symbol} already filled.", sim)
+            else:
+                summary.failed.append(entry)
+                self._log(logging.ERROR, f"{message} Cancellation failed after {result.attempts} attempt(s): {result.error}", sim)
 
-        if platform.system().lower() == "windows":
-            csv_file = pathlib.Path.home().joinpath("Documents", "Robinhood.csv")
-        else:
-            csv_file = pathlib.Path.home().joinpath("Robinhood.csv")
+        if summary.cancelled and not sim:
+            self._snapshot = None
 
-        if xlsx_file.is_file():
-            wb_obj = openpyxl.load_workbook(xlsx_file)
-            sheet = wb_obj.active
-            max_row = len(sheet["A"]) - 1
-            investments = {row[0].value: round(float(row[1].value), 2) for row in sheet.iter_rows(min_row=2, max_row=max_row)}
-            return investments
-        elif csv_file.is_file():
-            _list = []
-            with open(csv_file, 'r') as file:
-                data = csv.reader(file)
-                for row in data:
-                    if row:
-                        _list.append(row)
-            investments = {row[0]: float(row[1]) for row in _list[1:]}
-            return investments
-        else:
-            message = "Excel/CSV file not found. Run generate_excel_file()."
-            self._log(logging.ERROR, message)
-            raise Exception(message)
+        self._log(logging.INFO, f"{len(summary.cancelled)} cancelled, {len(summary.filled)} already filled, {len(summary.failed)} failed of {len(selected)} open order(s) selected.", sim)
+        return summary
 
 
-    def cancel_open_orders(self, side="all", sim=False):
-        orders = rh.orders.get_all_open_stock_orders()
+    def _find_placed_order(self, order, since):
+        # An order placed after the lost request, for the same instrument and side, that no earlier result accounts for.
+        # Robinhood's clock may be a little behind ours, hence the margin.
+        url = self._get_urls_by_symbol([order.symbol]).get(order.symbol)
+        known = {result.response.get("id") for result in self.order_engine.results if isinstance(result.response, dict)}
 
+        for placed in tracker.fetch_orders(self.rh, since - CLOCK_SKEW):
+            if placed.get("instrument") == url and placed.get("side") == order.side and placed.get("id") not in known:
+                return placed
+
+        return None
+
+
+    def _audit_order(self, event, order, sim, **fields):
+        value = "quantity" if "quantity" in order.function.__name__ else "amount"
+        logs.audit(event, symbol=order.symbol, side=order.side, order_type=order.function.__name__, **{value: order.args[1]}, sim=sim, **fields)
+
+
+    def _submit_orders(self, orders, sim=False):
         for order in orders:
-            order_id = order["id"]
-            order_side = order["side"] 
-            symbol = rh.stocks.get_instrument_by_url(order["instrument"], info="symbol")
+            self._audit_order("order_intent", order, sim)
+
+        results = self.order_engine.run(orders, sim)
 
-            if (side == "all") or (side == order_side):
-                if not sim:
-                    rh.orders.cancel_stock_order(order_id)
-                self._log(logging.INFO, f"Cancelling {order_side} order of {symbol}.", sim)
+        if orders and not sim:
+            self._snapshot = None
 
+        for result in results:
+            response = result.response if isinstance(result.response, dict) else {}
+            self._audit_order("order_submitted" if result.ok else "order_failed", result.order, sim, order_id=response.get("id"), state=response.get("state"), attempts=result.attempts, error=result.error)
 
+            if result.ok:
+                self._log(logging.INFO, result.order.message, sim)
+                if not sim and isinstance(result.response, dict) and "id" in result.response:
+                    self.tracker.track(result.response)
+            else:
+                self._log(logging.ERROR, f"{result.order.message} Order failed after {result.attempts} attempt(s): {result.error}", sim)
+
+        return results
+
+
+    def _submit_buy_orders(self, sell_results, buy_orders, buying_power, sim=False):
+        if sim:
+            return self._submit_orders(buy_orders, sim)
+
+        placed = [result.response for result in sell_results if result.ok and isinstance(result.response, dict) and "id" in result.response]
+        queued = [order for order in placed if order.get("state") == tracker.QUEUED]
+        # Sells queued until the market opens won't release buying power before then, so they aren't waited for.
+        futures = [self.tracker.track(order) for order in placed if order.get("state") != tracker.QUEUED] if self.settle_timeout else []
+        pending = collections.deque(buy_orders)
+        results = []
+
+        # Buys go out as soon as the buying power they need is available, either upfront or released by a filled sell.
+        def release(available):
+            ready = []
+            while pending and pending[0].args[1] <= available:
+                available -= pending[0].args[1]
+                ready.append(pending.popleft())
+            return ready, available
+
+        ready, available = release(buying_power)
+        results += self._submit_orders(ready)
+
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=self.settle_timeout):
+                ready, available = release(available + tracker.proceeds(future.result()))
+                results += self._submit_orders(ready)
+        except concurrent.futures.TimeoutError:
+            self._log(logging.WARNING, f"Sell orders did not settle within {self.settle_timeout} seconds. Placing the remaining buy orders.")
+
+        skipped = queued if self.settle_timeout else placed
+        if pending and skipped:
+            self._log(logging.WARNING, f"{len(skipped)} sell order(s) not waited for. Placing the remaining buy orders, which may exceed the buying power.")
+
+        results += self._submit_orders(list(pending))
+        return results
+
+
+    @metrics.timed
+    def wait_for_orders(self, timeout=None):
+        if self._tracker is None:
+            return []
+
+        queued = self.tracker.queued()
+        done, not_done = self.tracker.wait(timeout=self.settle_timeout if timeout is None else timeout, skip_queued=True)
+        states = collections.Counter(future.result()["state"] for future in done)
+
+        if states:
+            self._log(logging.INFO, "Orders settled: " + ", ".join(f"{count} {state}" for state, count in states.items()))
+        if queued:
+            self._log(logging.INFO, f"{len(queued)} order(s) queued until the market opens.")
+        if not_done:
+            self._log(logging.WARNING, f"{len(not_done)} order(s) still open.")
+
+        return [future.result() for future in done]
+
+
+    @metrics.timed
     def sell_all_stocks(self, sim=False):
         current_investments = self.get_current_investments()
+        self.paper = None
+        broker = self._get_broker(sim, dict(zip(current_investments.symbols, current_investments.prices.tolist())))
+        sell_orders = []
 
-        for instrument, data in current_investments.items():
-            available_shares = current_investments[instrument]["available_shares"]
-            collateral_shares = current_investments[instrument]["collateral_shares"]
-            if available_shares:
-                if not sim:
-                    order = rh.orders.order_sell_fractional_by_quantity(instrument, available_shares, "gfd", True)
-                self._log(logging.INFO, f"Selling {available_shares} share(s) of {instrument}.", sim)
-            
-            if collateral_shares:
-                self._log(logging.INFO, f"{collateral_shares} share(s) of {instrument} held as collateral", sim)
-            
-            time.sleep(5)
+        for index in current_investments.available_shares.nonzero()[0].tolist():
+            instrument = current_investments.symbols[index]
+            available_shares = float(current_investments.available_shares[index])
+            sell_orders.append(orders.Order(broker.order_sell_fractional_by_quantity, (instrument, available_shares), ORDER_OPTIONS, instrument, "sell", f"Selling {available_shares} share(s) of {instrument}."))
 
+        for index in current_investments.collateral_mask.nonzero()[0].tolist():
+            self._log(logging.INFO, f"{current_investments.collateral_shares[index]} share(s) of {current_investments.symbols[index]} held as collateral", sim)
 
-    def rebalance_old(self, sim=False):
+        return self._submit_orders(sell_orders, sim)
+
+
+    @metrics.timed
+    def get_rebalance_plan(self, max_age=None):
+        from . import planner
+
+        # Every figure below comes from the same snapshot so the plan reflects one point in time.
+        account = self.get_snapshot(max_age)
         self._check_list()
 
-        buying_power = float(rh.profiles.load_account_profile(info="buying_power"))
-        portfolio_value = self._get_portfolio_value()
+        buying_power = account.buying_power
+        portfolio_value = account.portfolio_value
         new_investments = self.get_new_investments()
         current_investments = self.get_current_investments()
-        
-        total = 0
-        counter = 0 
-
-        new_investments_set = set(new_investments.keys())
-        current_investments_set = set(current_investments.keys())
-        sell_list = list(current_investments_set - new_investments_set)
-
-        for instrument in current_investments.values():
-            if instrument["collateral_shares"]:
-                message = "Shares held as collateral. Cannot rebalance."
-                self._log(logging.ERROR, message)
-                raise Exception(message)
-        
-        for instrument in sell_list:
-            amount_to_sell = current_investments[instrument]["equity"]
-            shares = current_investments[instrument]["available_shares"]
-            
-            if not sim:
-                order = rh.orders.order_sell_fractional_by_quantity(instrument, shares, "gfd", True)
-            
-            self._log(logging.INFO, f"Selling ${amount_to_sell:.2f} of {instrument}.")
-            time.sleep(5)
-            counter += 1
 
-            if (counter % 10) == 0:
-                time.sleep(30)
+        if current_investments.has_collateral:
+            message = "Shares held as collateral. Cannot rebalance."
+            self._log(logging.ERROR, message)
+            raise Exception(message)
+
+        margin_ratios = self._get_margin_ratios(list(new_investments.keys()))
+        return planner.plan_from_investments(new_investments, current_investments, margin_ratios, buying_power, portfolio_value, self.absolute_band, self.relative_band, self.min_trade)
 
-        for instrument, percent in new_investments.items():
-            margin_ratio = float(rh.stocks.find_instrument_data(instrument)[0]["margin_initial_ratio"])
-            amount = ((buying_power + portfolio_value) * percent) / margin_ratio
-
-            if instrument in current_investments:
-                current_amount = current_investments[instrument]["equity"]
-                if amount > current_amount:
-                    amount_to_buy = amount - current_amount
-                    
-                    if not sim:
-                        order = rh.orders.order_buy_fractional_by_price(instrument, amount_to_buy, "gfd", True)
-
-                    self._log(logging.INFO, f"Buying ${amount_to_buy:.2f} from {instrument} to adjust to ${amount:.2f}")
-                elif amount < current_amount:
-                    amount_to_sell = current_amount - amount
-                    
-                    if not sim:
-                        order = rh.orders.order_sell_fractional_by_price(instrument, amount_to_sell, "gfd", True)
-
-                    self._log(logging.INFO, f"Selling ${amount_to_sell:.2f} from {instrument} to adjust to ${amount:.2f}")
-                else:
-                    self._log(logging.INFO, f"${amount:.2f} already invested in {instrument}")
+
+    def _make_orders(self, entries, broker):
+        made = {"sell": [], "buy": []}
+
+        for entry in entries:
+            made[entry["side"]].append(orders.Order(getattr(broker, entry["function"]), (entry["symbol"], entry["value"]), ORDER_OPTIONS, entry["symbol"], entry["side"], entry["message"]))
+
+        return made["sell"], made["buy"]
+
+
+    def _start_rebalance(self, sim=False):
+        plan = self.get_rebalance_plan()
+        prices = dict(zip(plan.symbols, plan.prices.tolist()))
+        self.paper = None
+        broker = self._get_broker(sim, prices)
+        sell_orders, buy_orders = self._make_orders(plans.entries(plan, prices), broker)
+
+        for order in plan.holds:
+            if order.amount >= 0.01:
+                self._log(logging.INFO, f"${order.current:.2f} invested in {order.symbol} is within the drift band of ${order.target:.2f}", sim)
             else:
-                if not sim:
-                    order = rh.orders.order_buy_fractional_by_price(instrument, amount, "gfd", True)
+                self._log(logging.INFO, f"${order.target:.2f} already invested in {order.symbol}", sim)
 
-                self._log(logging.INFO, f"Investing ${amount:.2f} in {instrument}")
-            
-            time.sleep(5)
-            counter += 1
+        if plan.avoided_count:
+            # Each avoided order is one order request and one slot of the rate limit.
+            seconds = plan.avoided_count / self.order_engine.bucket.rate
+            self._log(logging.INFO, f"Drift bands avoided {plan.avoided_count} of {plan.order_count + plan.avoided_count} order(s), {plan.avoided_count} order request(s) and {seconds:.1f}s of rate limit.", sim)
+
+        # Sells are submitted before any buy, and each buy waits until the buying power it needs has been released.
+        buying_power = self.get_snapshot().buying_power
+        return plan, self._submit_orders(sell_orders, sim), buy_orders, buying_power
 
-            if (counter % 10) == 0:
-                time.sleep(30)
 
-            total += amount
+    def _finish_rebalance(self, started, sim=False):
+        plan, results, buy_orders, buying_power = started
+        results += self._submit_buy_orders(results, buy_orders, buying_power, sim)
 
-        self._log(logging.INFO, f"Total Invested ${total:.2f}")
+        self._log(logging.INFO, f"Total Invested ${plan.total:.2f}", sim)
+        return results
+
+
+    @metrics.timed
+    def rebalance_old(self, sim=False):
+        return self._finish_rebalance(self._start_rebalance(sim), sim)
  
 
+    @metrics.timed
+    def prepare_plan(self, path=None, expiry=plans.EXPIRY, price_tolerance=plans.PRICE_TOLERANCE, buying_power_tolerance=plans.BUYING_POWER_TOLERANCE, max_order=None):
+        # Everything a rebalance needs ahead of time: a fresh snapshot, the allocation, the watchlist check and the
+        # amounts. New symbols are quoted now so that every order has a price to check against when it is executed.
+        plan = self.get_rebalance_plan(max_age=0)
+        prices = {symbol: price for symbol, price in zip(plan.symbols, plan.prices.tolist()) if not math.isnan(price)}
+        missing = [order.symbol for order in plan.buys if order.symbol not in prices]
+
+        if missing:
+            prices.update(self._get_latest_prices(missing))
+
+        try:
+            weights = self.get_new_investments()
+            data = plans.create(plan, prices, self.get_snapshot(), weights, expiry, price_tolerance, buying_power_tolerance, max_order, margin_ratios=self._get_margin_ratios(list(weights)))
+        except Exception as exception:
+            self._log(logging.ERROR, str(exception))
+            raise
+
+        path = plans.save(data, path or utils.get_file(plans.FILE_NAME))
+        self._log(logging.INFO, f"Plan with {len(data['orders'])} order(s) saved to {path}. It expires at {data['expires_at']}.")
+        return data
+
+
+    @metrics.timed
+    def execute_plan(self, path=None, sim=False):
+        start = time.monotonic()
+        path = path or utils.get_file(plans.FILE_NAME)
+
+        try:
+            data = plans.load(path)
+        except Exception as exception:
+            self._log(logging.ERROR, str(exception), sim)
+            raise
+
+        # Only what may have changed since the plan was made is fetched: quotes and buying power, sent together.
+        backend = self.rh
+        symbols = list(dict.fromkeys(entry["symbol"] for entry in data["orders"]))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            account_profile = executor.submit(backend.profiles.load_account_profile)
+            prices = executor.submit(self._get_latest_prices, symbols) if symbols else None
+
+        account_profile = account_profile.result() or {}
+        prices = prices.result() if prices else {}
+        buying_power = float(account_profile.get("buying_power") or 0)
+        problems = plans.check(data, account_profile.get("account_number"), buying_power, prices)
+
+        if problems:
+            message = "Plan not executed. " + " ".join(problems)
+            self._log(logging.ERROR, message, sim)
+            raise Exception(message)
+
+        checked = time.monotonic()
+
+        if not sim:
+            plans.mark_executed(data, path)
+
+        self.paper = None
+        broker = self._get_broker(sim, prices)
+        sell_orders, buy_orders = self._make_orders(data["orders"], broker)
+        results = self._submit_orders(sell_orders, sim)
+        results += self._submit_buy_orders(results, buy_orders, buying_power, sim)
+
+        first = min((result.finished for result in results), default=None)
+        self.metrics.add("plan_check_seconds", checked - start)
+
+        if first is None:
+            self._log(logging.INFO, f"Plan checked in {(checked - start) * 1000:.0f} ms. No orders to place.", sim)
+        else:
+            self.metrics.add("first_order_seconds", first - start)
+            self._log(logging.INFO, f"Plan checked in {(checked - start) * 1000:.0f} ms, first order placed {(first - start) * 1000:.0f} ms after start.", sim)
+
+        return results
+
+
+    @metrics.timed
     def rebalance(self, sim=False):
         self._check_list()
 
@@ -409,7 +746,7 @@ class Robinhood(object):
             self._log(logging.ERROR, message, sim)
             raise Exception(message)
 
-        account_type = rh.profiles.load_account_profile(info="type").lower()
+        account_type = self.get_snapshot().account_type
 
         if account_type == "margin":
             self.rebalance_margin(sim)
@@ -428,5 +765,56 @@ class Robinhood(object):
             amount_to_invest = 4
 
 
+    @metrics.timed
+    def sync_history(self, store=None):
+        from . import history
+
+        store = store or history.HistoryStore()
+        cursor = store.get_cursor("orders")
+
+        # Only orders updated since the last sync are fetched. Orders are stored by id, so fetching the last synced
+        # order again is harmless.
+        fetched = tracker.fetch_orders(self.rh, tracker.parse_timestamp(cursor) if cursor else 0)
+        new = store.add_orders(fetched, self._get_symbols_by_url([order["instrument"] for order in fetched]) if fetched else {})
+
+        account = self.get_snapshot(max_age=0)
+        position_symbols = self._get_position_symbols(account.positions)
+        prices = self._get_latest_prices(list(dict.fromkeys(position_symbols))) if position_symbols else {}
+        current_investments = self._get_investments(account, position_symbols, prices)
+        rows = [
+            (symbol, float(position["quantity"]), float(position["average_buy_price"]) if position.get("average_buy_price") else None, price, equity)
+            for symbol, position, price, equity in zip(current_investments.symbols, account.positions, current_investments.prices.tolist(), current_investments.equity.tolist())
+        ]
+        recorded = store.add_positions(tracker.timestamp(account.fetched_at), rows)
+
+        self._log(logging.INFO, f"{len(fetched)} order(s) fetched, {new} new. {recorded} position(s) recorded.")
+        return {"orders": len(fetched), "new_orders": new, "positions": recorded}
+
+
+    @metrics.timed
+    def run_backtest(self, price_file, frequency="monthly", capital=10000.0, cost=0.0):
+        from . import backtest
+
+        try:
+            prices = backtest.load_prices(price_file)
+            return backtest.run(self.get_new_investments(), prices, capital, frequency, self.absolute_band, self.relative_band, self.min_trade, cost)
+        except Exception as exception:
+            self._log(logging.ERROR, str(exception))
+            raise
+
+
+    @metrics.timed
+    def clear_cache(self):
+        self.cache.clear()
+        self._log(logging.INFO, "Instrument cache cleared.")
+
+
+    def export_metrics(self, profile=False):
+        self.metrics.write(utils.get_file("Robinhood.metrics.json"), utils.get_file("Robinhood.prom"))
+
+        if profile:
+            print(self.metrics.profile())
+
+
     def test(self):
         print("Test Function Executed")
\ No newline at end of file
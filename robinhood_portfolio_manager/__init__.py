@@ -14,9 +14,9 @@
 
 
 import sys
-import time
+import json
+import atexit
 import argparse
-from . import Robinhood
 
 
 def main():
@@ -31,8 +31,48 @@ def main():
 	parser.add_argument("-o", "--get_current_investments", action="store_true", required=False, help="Get current investments", dest="get_current_investments")
 	parser.add_argument("-p", "--sell_all_stocks", action="store_true", required=False, help="Sell all stocks", dest="sell_all_stocks")
 	parser.add_argument("-r", "--rebalance", action="store_true", required=False, help="Rebalance portfolio", dest="rebalance")
+	parser.add_argument("-l", "--rate_limit", action="store", type=float, required=False, help="Maximum number of orders placed per second (default: 1)", dest="rate_limit")
+	parser.add_argument("-w", "--workers", action="store", type=int, required=False, help="Number of orders placed concurrently (default: 4)", dest="workers")
+	parser.add_argument("-b", "--drift_band", action="store", type=float, required=False, help="Skip symbols within this many percentage points of the allocated value from their target", dest="drift_band")
+	parser.add_argument("-e", "--relative_band", action="store", type=float, required=False, help="Skip symbols within this percentage of their own target", dest="relative_band")
+	parser.add_argument("-t", "--min_trade", action="store", type=float, required=False, help="Skip orders smaller than this dollar amount", dest="min_trade")
+	parser.add_argument("-i", "--settle_timeout", action="store", type=float, required=False, help="Seconds to wait for placed orders to settle, 0 to place orders without waiting (default: 600)", dest="settle_timeout")
+	parser.add_argument("-x", "--clear_cache", action="store_true", required=False, help="Clear cached instrument data", dest="clear_cache")
+	parser.add_argument("-m", "--accounts", action="store", required=False, help="Run -o/-a/-p/-r for every account in a JSON config file, in parallel", dest="accounts")
+	parser.add_argument("-f", "--profile", action="store_true", required=False, help="Print a per-phase timing breakdown and API call metrics", dest="profile")
 	parser.add_argument("-d", "--debug", action="store_true", required=False, help="Run test function for debugging", dest="debug")
 	parser.add_argument("-a", "--cancel_open_orders", action="store", choices=["all", "sell", "buy"], required=False, help="Cancel all open orders", dest="cancel_open_orders")
+	parser.add_argument("-y", "--symbols", action="store", nargs="+", required=False, help="Only cancel open orders of these symbols", dest="symbols")
+	parser.add_argument("-u", "--instruments", action="store", nargs="+", required=False, help="Only cancel open orders of these instrument URLs", dest="instruments")
+	parser.add_argument("-k", "--older_than", action="store", type=float, required=False, help="Only cancel open orders placed more than this many minutes ago", dest="older_than")
+
+	subparsers = parser.add_subparsers(dest="command", metavar="command")
+	serve_parser = subparsers.add_parser("serve", help="Keep one logged-in session and the portfolio in memory, and accept commands on a local socket")
+	serve_parser.add_argument("--quote_interval", action="store", type=float, default=15, help="Seconds between quote refreshes (default: 15)", dest="quote_interval")
+	serve_parser.add_argument("--position_interval", action="store", type=float, default=300, help="Seconds between position refreshes (default: 300)", dest="position_interval")
+	backtest_parser = subparsers.add_parser("backtest", help="Replay the allocation and rebalance rules over historical prices (CSV or Parquet)")
+	backtest_parser.add_argument("prices", help="Price file with one column per symbol, or date/symbol/close rows")
+	backtest_parser.add_argument("--frequency", action="store", choices=["daily", "weekly", "monthly", "quarterly", "yearly", "never"], default="monthly", help="How often to rebalance (default: monthly)", dest="frequency")
+	backtest_parser.add_argument("--capital", action="store", type=float, default=10000.0, help="Starting capital (default: 10000)", dest="capital")
+	backtest_parser.add_argument("--cost", action="store", type=float, default=0.0, help="Trading cost in percent of the traded amount (default: 0)", dest="cost")
+	plan_parser = subparsers.add_parser("plan", help="Prepare a rebalance now and save it for 'ropoma execute'")
+	plan_parser.add_argument("plan", nargs="?", help="Plan file to write (default: Robinhood.plan.json next to the log file)")
+	plan_parser.add_argument("--expires", action="store", type=float, default=720, help="Minutes the plan stays valid (default: 720)", dest="expires")
+	plan_parser.add_argument("--price_tolerance", action="store", type=float, default=5, help="Largest price move in percent, from planning to execution, that still lets the plan run (default: 5)", dest="price_tolerance")
+	plan_parser.add_argument("--buying_power_tolerance", action="store", type=float, default=5, help="Largest drop of buying power in percent that still lets the plan run (default: 5)", dest="buying_power_tolerance")
+	plan_parser.add_argument("--max_order", action="store", type=float, help="Largest dollar amount of a single order (default: the largest target, or the portfolio value if larger)", dest="max_order")
+	execute_parser = subparsers.add_parser("execute", help="Check quotes and buying power against a saved plan and place its orders")
+	execute_parser.add_argument("plan", nargs="?", help="Plan file to execute (default: Robinhood.plan.json next to the log file)")
+	execute_parser.add_argument("-s", "--simulation", action="store_true", required=False, help="Run simulation without placing actual orders", dest="execute_sim")
+	subparsers.add_parser("sync", help="Store new and updated orders and a snapshot of the positions in the local history")
+	history_parser = subparsers.add_parser("history", help="Report turnover, realized P&L and trade counts from the local history")
+	history_parser.add_argument("--since", action="store", help="First day of the period, YYYY-MM-DD", dest="since")
+	history_parser.add_argument("--until", action="store", help="Day after the end of the period, YYYY-MM-DD", dest="until")
+	history_parser.add_argument("--symbol", action="store", help="Only report this symbol", dest="symbol")
+	send_parser = subparsers.add_parser("send", help="Send a command to a running 'ropoma serve'")
+	send_parser.add_argument("request", choices=["report", "status", "refresh", "get_new_investments", "cancel", "sell_all", "rebalance", "stop"], help="Command to send")
+	send_parser.add_argument("side", nargs="?", choices=["all", "sell", "buy"], default="all", help="Side of the open orders to cancel (default: all)")
+	send_parser.add_argument("-s", "--simulation", action="store_true", required=False, help="Run simulation without placing actual orders", dest="send_sim")
 	
 	args = parser.parse_args()
 
@@ -44,7 +84,132 @@ def main():
 		kwargs["password"] = args.creds[1]
 		kwargs["totp"] = args.creds[2]
 
+	if args.rate_limit:
+		kwargs["rate_limit"] = args.rate_limit
+
+	if args.workers:
+		kwargs["workers"] = args.workers
+
+	if args.settle_timeout is not None:
+		kwargs["settle_timeout"] = args.settle_timeout
+
+	if args.drift_band:
+		kwargs["absolute_band"] = args.drift_band / 100
+
+	if args.relative_band:
+		kwargs["relative_band"] = args.relative_band / 100
+
+	if args.min_trade:
+		kwargs["min_trade"] = args.min_trade
+
+	if args.accounts:
+		from . import accounts
+
+		commands = []
+		if args.get_current_investments:
+			commands.append(("get_current_investments", None))
+		if args.cancel_open_orders:
+			commands.append(("cancel_open_orders", args.cancel_open_orders))
+		if args.sell_all_stocks:
+			commands.append(("sell_all_stocks", None))
+		if args.rebalance:
+			commands.append(("rebalance", None))
+
+		if not commands:
+			parser.error("--accounts requires one of -o, -a, -p or -r.")
+
+		defaults = {key: value for key, value in kwargs.items() if key in accounts.OPTIONS}
+		accounts.print_report(accounts.run(args.accounts, commands, args.sim, **defaults))
+		sys.exit()
+
+	if args.command == "send":
+		from . import client
+
+		try:
+			response = client.request(client.get_socket_file(), {"command": args.request, "side": args.side, "sim": args.sim or args.send_sim})
+		except OSError:
+			parser.error("ropoma serve is not running.")
+
+		if not response["ok"]:
+			print(response["error"])
+			sys.exit(1)
+
+		result = response["result"]
+		for instrument, data in result.get("investments", {}).items():
+			print(f"{instrument}: ${data['equity']:.2f} ({data['percentage']:.2f}%)")
+		if args.request == "cancel":
+			print(f"{len(result['cancelled'])} cancelled, {len(result['filled'])} already filled, {len(result['failed'])} failed")
+		for order in result.get("orders", []):
+			print(order["message"] if order["ok"] else f"{order['message']} {order['error']}")
+		if args.request in ("status", "refresh", "get_new_investments"):
+			print(json.dumps(result, indent=2))
+		print(f"Answered in {response['ms']:.1f} ms")
+		sys.exit()
+
+	if args.command == "history":
+		from . import history
+
+		# Reads the local history only, so no login is needed.
+		store = history.HistoryStore()
+		symbol = args.symbol.upper() if args.symbol else None
+		turnover = store.turnover(args.since, args.until, symbol)
+		pnl = store.realized_pnl(args.since, args.until, symbol)
+		counts = store.trade_counts(args.since, args.until, symbol)
+
+		print(f"Period:\t\t\t{args.since or 'start'} to {args.until or 'now'}")
+		print(f"Last Synced Order:\t{store.get_cursor('orders') or 'never'}")
+		print(f"Bought:\t\t\t${turnover['buy']:.2f}")
+		print(f"Sold:\t\t\t${turnover['sell']:.2f}")
+		print(f"Turnover:\t\t${turnover['total']:.2f}")
+		print(f"Realized P&L:\t\t${sum(pnl.values()):.2f}")
+		for instrument, count in counts.items():
+			print(f"\t{instrument}:\t{count['buy']} buy(s)\t{count['sell']} sell(s)\t${pnl.get(instrument, 0.0):.2f}")
+		sys.exit()
+
+	# Imported after parsing so that `ropoma -h` and argument errors don't pay for loading the module.
+	from . import Robinhood
+
 	robinhood = Robinhood.Robinhood(**kwargs)
+	atexit.register(robinhood.export_metrics, args.profile)
+
+	if args.command == "serve":
+		from . import daemon
+
+		daemon.serve(robinhood, quote_interval=args.quote_interval, position_interval=args.position_interval)
+		sys.exit()
+
+	if args.command == "plan":
+		robinhood.prepare_plan(args.plan, args.expires * 60, args.price_tolerance / 100, args.buying_power_tolerance / 100, args.max_order)
+		sys.exit()
+
+	if args.command == "execute":
+		sim = args.sim or args.execute_sim
+		robinhood.execute_plan(args.plan, sim)
+		if not sim:
+			robinhood.wait_for_orders()
+		sys.exit()
+
+	if args.command == "sync":
+		robinhood.sync_history()
+		sys.exit()
+
+	if args.command == "backtest":
+		result = robinhood.run_backtest(args.prices, args.frequency, args.capital, args.cost / 100)
+
+		print(f"Period:\t\t\t{result.dates[0]} to {result.dates[-1]}")
+		print(f"Final Value:\t\t${result.values[-1]:.2f}")
+		print(f"Total Return:\t\t{result.total_return * 100:.2f}%")
+		print(f"Annual Return:\t\t{result.cagr * 100:.2f}%")
+		print(f"Volatility:\t\t{result.volatility * 100:.2f}%")
+		print(f"Max Drawdown:\t\t{result.max_drawdown * 100:.2f}%")
+		print(f"Rebalances:\t\t{int((result.orders > 0).sum())} of {len(result.orders)}")
+		print(f"Orders:\t\t\t{result.order_count}")
+		print(f"Turnover:\t\t${result.turnover:.2f}")
+		print(f"Costs:\t\t\t${result.costs:.2f}")
+		sys.exit()
+
+	if args.clear_cache:
+		robinhood.clear_cache()
 
 	if args.generate_file:
 		if args.generate_file == "csv":
@@ -71,21 +236,21 @@ def main():
 			print(f"\tCollateral Shares:\t{data['collateral_shares']:.2f}")
 
 	if args.cancel_open_orders:
-		robinhood.cancel_open_orders(args.cancel_open_orders, args.sim)
+		robinhood.cancel_open_orders(args.cancel_open_orders, args.sim, args.symbols, args.instruments, args.older_than * 60 if args.older_than is not None else None)
 
 	if args.sell_all_stocks:
 		robinhood.sell_all_stocks(args.sim)
-		
-		for sec in range(10, 0, -1):
-			print(f"Cooling down {sec}")
-			time.sleep(1)
+		robinhood.wait_for_orders()
 
 	if args.rebalance:
 		robinhood.rebalance(args.sim)
-		
-		for sec in range(10, 0, -1):
-			print(f"Cooling down {sec}")
-			time.sleep(1)
+		robinhood.wait_for_orders()
+
+	if args.sim and robinhood.paper is not None:
+		print("Simulated portfolio:")
+		for instrument, data in robinhood.paper.get_investments().items():
+			print(f"\t{instrument}:\t{data['shares']:.6f} share(s)\t${data['equity']:.2f}\t{data['percentage']:.2f}%")
+		print(f"\tBuying Power:\t${robinhood.paper.buying_power:.2f}")
 
 	if args.debug:
 		robinhood.test()
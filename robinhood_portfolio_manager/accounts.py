@@ -0,0 +1,125 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import os
+import re
+import json
+import time
+import concurrent.futures
+from . import logs
+from . import utils
+
+
+REQUIRED = ("name", "username", "password", "totp")
+OPTIONS = ("allocation_file", "rate_limit", "workers", "settle_timeout", "absolute_band", "relative_band", "min_trade")
+
+
+def load_config(path):
+    with open(path) as file:
+        config = json.load(file)
+
+    accounts = config.get("accounts", [])
+    if not accounts:
+        raise Exception(f"No accounts found in {path}.")
+
+    names = set()
+    for account in accounts:
+        missing = [key for key in REQUIRED if not account.get(key)]
+        if missing:
+            raise Exception(f"Account {account.get('name', '?')} in {path} is missing {', '.join(missing)}.")
+
+        if account["name"] in names:
+            raise Exception(f"Account {account['name']} is listed more than once in {path}.")
+
+        names.add(account["name"])
+        if account.get("allocation_file"):
+            account["allocation_file"] = os.path.expanduser(account["allocation_file"])
+
+    return accounts
+
+
+def run_account(account, commands, sim=False, defaults=None):
+    # Runs in its own process: robin_stocks keeps its session in module globals, so accounts can't share an interpreter.
+    from . import Robinhood
+
+    # Each account logs to its own files, rotating a file shared between processes would lose or mix records.
+    name = re.sub(r"[^\w.-]", "_", account["name"])
+    logs.configure(utils.get_file(f"Robinhood.{name}.log"), utils.get_file(f"Robinhood.{name}.audit.jsonl"))
+
+    start = time.perf_counter()
+    report = {"account": account["name"], "ok": True, "error": None, "orders": [], "current_investments": None, "cancel": None}
+    kwargs = dict(defaults or {}, **{key: account[key] for key in OPTIONS if account.get(key) is not None})
+
+    try:
+        robinhood = Robinhood.Robinhood(username=account["username"], password=account["password"], totp=account["totp"], account_name=account["name"], **kwargs)
+
+        for command, argument in commands:
+            if command == "get_current_investments":
+                report["current_investments"] = dict(robinhood.get_current_investments())
+            elif command == "cancel_open_orders":
+                report["cancel"] = {key: len(value) for key, value in robinhood.cancel_open_orders(argument, sim)._asdict().items()}
+            elif command == "sell_all_stocks":
+                report["orders"] += [result.as_dict() for result in robinhood.sell_all_stocks(sim)]
+                robinhood.wait_for_orders()
+            elif command == "rebalance":
+                report["orders"] += [result.as_dict() for result in robinhood.rebalance_old(sim)]
+                robinhood.wait_for_orders()
+
+        report["api_calls"] = sum(robinhood.metrics.calls.values())
+    except Exception as exception:
+        report["ok"] = False
+        report["error"] = str(exception)
+    finally:
+        # Worker processes end without running atexit handlers, so the log files are flushed here.
+        logs.stop()
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def run(path, commands, sim=False, max_workers=None, **defaults):
+    accounts = load_config(path)
+    reports = []
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers or len(accounts)) as executor:
+        futures = {executor.submit(run_account, account, commands, sim, defaults): account["name"] for account in accounts}
+
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                reports.append(future.result())
+            except Exception as exception:
+                reports.append({"account": futures[future], "ok": False, "error": str(exception), "orders": [], "current_investments": None, "seconds": 0.0})
+
+    return sorted(reports, key=lambda report: report["account"])
+
+
+def print_report(reports):
+    for report in reports:
+        orders = report["orders"]
+        failed = [order for order in orders if not order["ok"]]
+        status = "OK" if report["ok"] else f"FAILED: {report['error']}"
+        print(f"{report['account']}: {status} ({report['seconds']:.1f}s, {len(orders)} order(s), {len(failed)} failed, {report.get('api_calls', 0)} API call(s))")
+
+        if report.get("cancel"):
+            print("\t" + ", ".join(f"{count} {state}" for state, count in report["cancel"].items()) + " open order(s)")
+
+        for order in failed:
+            print(f"\t{order['message']} {order['error']}")
+
+        for instrument, data in (report["current_investments"] or {}).items():
+            print(f"\t{instrument}: ${data['equity']:.2f} ({data['percentage']:.2f}%)")
+
+    total = sum(len(report["orders"]) for report in reports)
+    print(f"{len(reports)} account(s), {total} order(s), {sum(not report['ok'] for report in reports)} failed account(s)")
@@ -0,0 +1,113 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import csv
+import pathlib
+import threading
+import collections
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class Allocation(collections.namedtuple("Allocation", ["symbols", "weights", "path", "kind"])):
+
+    __slots__ = ()
+
+    def as_dict(self):
+        return dict(zip(self.symbols, self.weights))
+
+
+    @property
+    def total(self):
+        return sum(self.weights)
+
+
+def _excel_rows(path):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(min_row=2, max_col=2, values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _csv_rows(path):
+    with open(path, "r", newline="") as file:
+        rows = csv.reader(file)
+        next(rows, None)
+
+        for row in rows:
+            if row:
+                yield row
+
+
+def _parse(path, kind):
+    # Excel percentages are fractions (0.25 is 25%), CSV percentages are written out (25.00 is 25%).
+    rows, scale, name = (_excel_rows(path), 1, "excel") if kind == "excel" else (_csv_rows(path), 100, "CSV")
+    symbols = []
+    weights = []
+    seen = set()
+    total = 0.0
+
+    for row in rows:
+        symbol = row[0].strip() if isinstance(row[0], str) else row[0]
+        if not symbol or symbol == "Total":
+            continue
+
+        try:
+            percent = float(row[1])
+        except (IndexError, TypeError, ValueError):
+            raise Exception(f"Invalid percentage for {symbol}. Check {name} file.")
+
+        if symbol in seen:
+            raise Exception(f"{symbol} is listed more than once. Check {name} file.")
+
+        seen.add(symbol)
+        symbols.append(symbol)
+        weights.append(percent / scale)
+        total += percent
+
+    if round(total, 2) != scale:
+        raise Exception(f"Total percentage doesn't add up to 100%. Check {name} file.")
+
+    return Allocation(tuple(symbols), tuple(weights), path, kind)
+
+
+def load(path):
+    path = pathlib.Path(path)
+    stat = path.stat()
+    key = str(path.resolve())
+    kind = "excel" if path.suffix.lower() in (".xlsx", ".xlsm") else "csv"
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+
+    allocation = _parse(path, kind)
+
+    with _lock:
+        _cache[key] = ((stat.st_mtime_ns, stat.st_size), allocation)
+
+    return allocation
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,234 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import csv
+import pathlib
+import collections
+import numpy as np
+from . import planner
+
+
+FREQUENCIES = ("daily", "weekly", "monthly", "quarterly", "yearly", "never")
+TRADING_DAYS = 252
+DATE_COLUMNS = ("date", "day", "timestamp")
+SYMBOL_COLUMNS = ("symbol", "ticker")
+PRICE_COLUMNS = ("adj_close", "adjusted_close", "close", "price")
+
+
+class Prices(collections.namedtuple("Prices", ["dates", "symbols", "values"])):
+
+    __slots__ = ()
+
+    def select(self, symbols):
+        index = {symbol: position for position, symbol in enumerate(self.symbols)}
+        missing = [symbol for symbol in symbols if symbol not in index]
+
+        if missing:
+            raise Exception(f"No prices for {', '.join(missing)}.")
+
+        return Prices(self.dates, tuple(symbols), self.values[:, [index[symbol] for symbol in symbols]])
+
+
+class BacktestResult(collections.namedtuple("BacktestResult", ["dates", "values", "rebalance_dates", "orders", "turnover", "costs"])):
+
+    __slots__ = ()
+
+    @property
+    def total_return(self):
+        return self.values[-1] / self.values[0] - 1
+
+
+    @property
+    def cagr(self):
+        years = (self.dates[-1] - self.dates[0]).astype("timedelta64[D]").astype(np.float64) / 365.25
+        return (self.values[-1] / self.values[0]) ** (1 / years) - 1 if years > 0 else 0.0
+
+
+    @property
+    def volatility(self):
+        returns = np.diff(self.values) / self.values[:-1]
+        return float(np.std(returns) * np.sqrt(TRADING_DAYS)) if len(returns) else 0.0
+
+
+    @property
+    def max_drawdown(self):
+        return float(np.max(1 - self.values / np.maximum.accumulate(self.values)))
+
+
+    @property
+    def order_count(self):
+        return int(self.orders.sum())
+
+
+def _column(header, names):
+    lowered = [name.strip().lower() for name in header]
+
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+
+    return None
+
+
+def _from_long(dates, symbols, values):
+    # One row per day and symbol, pivoted into a days x symbols matrix.
+    dates, day_index = np.unique(np.array(dates, dtype="datetime64[D]"), return_inverse=True)
+    symbols, symbol_index = np.unique(np.array(symbols), return_inverse=True)
+    matrix = np.full((len(dates), len(symbols)), np.nan)
+    matrix[day_index, symbol_index] = values
+    return Prices(dates, tuple(symbols.tolist()), matrix)
+
+
+def _load_csv(path):
+    with open(path, "r", newline="") as file:
+        rows = csv.reader(file)
+        header = next(rows)
+        date = _column(header, DATE_COLUMNS) or 0
+        symbol = _column(header, SYMBOL_COLUMNS)
+
+        if symbol is not None:
+            price = _column(header, PRICE_COLUMNS)
+            if price is None:
+                raise Exception(f"No price column ({', '.join(PRICE_COLUMNS)}) in {path}.")
+
+            dates, symbols, values = [], [], []
+            for row in rows:
+                if row and row[price]:
+                    dates.append(row[date][:10])
+                    symbols.append(row[symbol].strip().upper())
+                    values.append(float(row[price]))
+
+            return _from_long(dates, symbols, np.array(values))
+
+        # One row per day and one column per symbol.
+        columns = [index for index in range(len(header)) if index != date]
+        dates, values = [], []
+        for row in rows:
+            if row:
+                dates.append(row[date][:10])
+                values.append([float(row[index]) if row[index] else np.nan for index in columns])
+
+    order = np.argsort(np.array(dates, dtype="datetime64[D]"), kind="stable")
+    return Prices(np.array(dates, dtype="datetime64[D]")[order], tuple(header[index].strip().upper() for index in columns), np.array(values, dtype=np.float64).reshape(len(dates), len(columns))[order])
+
+
+def _load_parquet(path):
+    try:
+        import pandas as pd
+    except ImportError:
+        raise Exception("Reading Parquet files requires pandas and pyarrow. Install them or convert the prices to CSV.")
+
+    frame = pd.read_parquet(path)
+    columns = {name.lower(): name for name in map(str, frame.columns)}
+    date = next((columns[name] for name in DATE_COLUMNS if name in columns), None)
+    symbol = next((columns[name] for name in SYMBOL_COLUMNS if name in columns), None)
+
+    if symbol is not None:
+        price = next((columns[name] for name in PRICE_COLUMNS if name in columns), None)
+        if price is None:
+            raise Exception(f"No price column ({', '.join(PRICE_COLUMNS)}) in {path}.")
+
+        frame = frame.dropna(subset=[price])
+        return _from_long(frame[date].astype("datetime64[ns]").to_numpy(), frame[symbol].astype(str).str.upper().to_numpy(), frame[price].to_numpy(np.float64))
+
+    frame = frame.set_index(date) if date is not None else frame
+    frame = frame.sort_index()
+    return Prices(frame.index.to_numpy().astype("datetime64[D]"), tuple(str(name).upper() for name in frame.columns), frame.to_numpy(np.float64))
+
+
+def load_prices(path):
+    path = pathlib.Path(path)
+
+    if not path.is_file():
+        raise Exception(f"Price file {path} not found.")
+
+    return _load_parquet(path) if path.suffix.lower() in (".parquet", ".pq") else _load_csv(path)
+
+
+def _forward_fill(values):
+    # Days without a price keep the last known one. Days before a symbol's first price stay NaN.
+    index = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
+
+
+def rebalance_days(dates, frequency="monthly"):
+    if frequency not in FREQUENCIES:
+        raise Exception(f"Unknown rebalance frequency {frequency}. Choose one of {', '.join(FREQUENCIES)}.")
+
+    if frequency == "never":
+        return np.array([0])
+
+    if frequency == "daily":
+        return np.arange(len(dates))
+
+    days = dates.astype("datetime64[D]")
+    if frequency == "weekly":
+        # The epoch is a Thursday, shifting by 3 days starts each week on a Monday.
+        periods = (days.astype(np.int64) + 3) // 7
+    elif frequency == "monthly":
+        periods = days.astype("datetime64[M]").astype(np.int64)
+    elif frequency == "quarterly":
+        periods = days.astype("datetime64[M]").astype(np.int64) // 3
+    else:
+        periods = days.astype("datetime64[Y]").astype(np.int64)
+
+    return np.concatenate(([0], np.flatnonzero(np.diff(periods)) + 1))
+
+
+def run(allocation, prices, capital=10000.0, frequency="monthly", absolute_band=0.0, relative_band=0.0, min_trade=0.0, cost=0.0):
+    symbols = list(allocation)
+    prices = prices.select(symbols)
+    values = _forward_fill(prices.values)
+    weights = np.array([allocation[symbol] for symbol in symbols], dtype=np.float64)
+    ones = np.ones(len(symbols))
+    bands = [planner.per_symbol(band, symbols) for band in (absolute_band, relative_band, min_trade)]
+
+    shares = np.zeros(len(symbols))
+    cash = float(capital)
+    days = rebalance_days(prices.dates, frequency)
+    bounds = np.append(days, len(prices.dates))
+    portfolio = np.empty(len(prices.dates))
+    orders = np.zeros(len(days), dtype=np.int64)
+    turnover = 0.0
+    costs = 0.0
+
+    for step, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        price = values[start]
+        tradeable = ~np.isnan(price)
+        equity = np.where(tradeable, shares * np.nan_to_num(price), 0.0)
+
+        # Same rules as a live rebalance. Cash is the buying power and the holdings are the portfolio value, so the
+        # targets add up to the account value. Symbols without a price yet keep their share in cash.
+        plan = planner.plan(symbols, np.where(tradeable, weights, 0.0), equity, shares, price, ones, cash, float(equity.sum()), *bands)
+        trades = np.where(plan.actions != planner.HOLD, plan.deltas, 0.0)
+
+        buys = trades[trades > 0].sum()
+        available = cash - trades[trades < 0].sum()
+        if buys > available > 0:
+            # Symbols held above target inside their band can leave the buys short of cash, so they are scaled down.
+            trades[trades > 0] *= available / buys
+
+        traded = np.abs(trades).sum()
+        shares = shares + np.where(tradeable, trades / np.where(tradeable, price, 1.0), 0.0)
+        cash -= trades.sum() + traded * cost
+        orders[step] = plan.order_count
+        turnover += traded
+        costs += traded * cost
+
+        # Between rebalances the holdings don't change, so the whole segment is valued in one product.
+        portfolio[start:end] = np.nan_to_num(values[start:end]) @ shares + cash
+
+    return BacktestResult(prices.dates, portfolio, prices.dates[days], orders, turnover, costs)
@@ -0,0 +1,177 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import time
+import sqlite3
+import threading
+import collections
+from . import utils
+
+
+# Seconds before a cached field is considered stale. Symbols practically never change for an instrument URL,
+# margin requirements are adjusted by Robinhood from time to time.
+DEFAULT_TTL = {"symbol": 30 * 24 * 60 * 60, "margin_initial_ratio": 24 * 60 * 60}
+FIELDS = ("symbol", "margin_initial_ratio")
+SQLITE_BATCH_SIZE = 500
+
+
+class LRU(object):
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.data = collections.OrderedDict()
+
+
+    def get(self, key):
+        if key not in self.data:
+            return None
+
+        self.data.move_to_end(key)
+        return self.data[key]
+
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+
+        while len(self.data) > self.size:
+            self.data.popitem(last=False)
+
+
+    def pop(self, key):
+        self.data.pop(key, None)
+
+
+    def clear(self):
+        self.data.clear()
+
+
+class InstrumentCache(object):
+
+    def __init__(self, path=None, ttl=None, lru_size=1024):
+        self.path = path or utils.get_file("Robinhood.cache.sqlite")
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.instruments = LRU(lru_size)
+        self.urls = LRU(lru_size)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS instruments (url TEXT PRIMARY KEY, symbol TEXT, symbol_updated REAL, margin_initial_ratio REAL, margin_initial_ratio_updated REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS instruments_symbol ON instruments (symbol)")
+        self.connection.commit()
+
+
+    def _is_fresh(self, record, field):
+        updated = record.get(f"{field}_updated")
+        return record.get(field) is not None and updated is not None and (time.time() - updated) < self.ttl[field]
+
+
+    def _load(self, column, values):
+        records = {}
+        missing = []
+
+        for value in values:
+            url = value if column == "url" else self.urls.get(value)
+            record = self.instruments.get(url) if url else None
+            if record:
+                records[value] = record
+            else:
+                missing.append(value)
+
+        for index in range(0, len(missing), SQLITE_BATCH_SIZE):
+            batch = missing[index:index + SQLITE_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(f"SELECT url, symbol, symbol_updated, margin_initial_ratio, margin_initial_ratio_updated FROM instruments WHERE {column} IN ({placeholders})", batch)
+
+            for url, symbol, symbol_updated, margin_initial_ratio, margin_initial_ratio_updated in rows:
+                record = {"url": url, "symbol": symbol, "symbol_updated": symbol_updated, "margin_initial_ratio": margin_initial_ratio, "margin_initial_ratio_updated": margin_initial_ratio_updated}
+                self.instruments.put(url, record)
+                if symbol:
+                    self.urls.put(symbol, url)
+                records[url if column == "url" else symbol] = record
+
+        return records
+
+
+    def get_symbols(self, urls):
+        with self.lock:
+            records = self._load("url", list(dict.fromkeys(urls)))
+
+        return {url: record["symbol"] for url, record in records.items() if self._is_fresh(record, "symbol")}
+
+
+    def get_urls(self, symbols):
+        with self.lock:
+            records = self._load("symbol", list(dict.fromkeys(symbols)))
+
+        return {symbol: record["url"] for symbol, record in records.items() if self._is_fresh(record, "symbol")}
+
+
+    def get_margin_ratios(self, symbols):
+        with self.lock:
+            records = self._load("symbol", list(dict.fromkeys(symbols)))
+
+        return {symbol: record["margin_initial_ratio"] for symbol, record in records.items() if self._is_fresh(record, "margin_initial_ratio")}
+
+
+    def update(self, instruments):
+        now = time.time()
+        rows = []
+
+        with self.lock:
+            for instrument in instruments:
+                margin_initial_ratio = instrument.get("margin_initial_ratio")
+                record = {
+                    "url": instrument["url"],
+                    "symbol": instrument["symbol"],
+                    "symbol_updated": now,
+                    "margin_initial_ratio": float(margin_initial_ratio) if margin_initial_ratio is not None else None,
+                    "margin_initial_ratio_updated": now if margin_initial_ratio is not None else None
+                }
+                self.instruments.put(record["url"], record)
+                self.urls.put(record["symbol"], record["url"])
+                rows.append(tuple(record[key] for key in ("url", "symbol", "symbol_updated", "margin_initial_ratio", "margin_initial_ratio_updated")))
+
+            self.connection.executemany("INSERT OR REPLACE INTO instruments VALUES (?, ?, ?, ?, ?)", rows)
+            self.connection.commit()
+
+
+    def invalidate(self, urls=None, symbols=None, field=None):
+        fields = [field] if field else FIELDS
+
+        with self.lock:
+            if urls is None and symbols is None:
+                for field in fields:
+                    self.connection.execute(f"UPDATE instruments SET {field}_updated = NULL")
+                self.instruments.clear()
+                self.urls.clear()
+            else:
+                targets = [("url", url) for url in urls or []] + [("symbol", symbol) for symbol in symbols or []]
+
+                for column, value in targets:
+                    for field in fields:
+                        self.connection.execute(f"UPDATE instruments SET {field}_updated = NULL WHERE {column} = ?", (value,))
+                    url = value if column == "url" else self.urls.get(value)
+                    if url:
+                        self.instruments.pop(url)
+
+            self.connection.commit()
+
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM instruments")
+            self.connection.commit()
+            self.instruments.clear()
+            self.urls.clear()
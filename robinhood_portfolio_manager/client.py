@@ -0,0 +1,40 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import json
+import socket
+from . import utils
+
+
+# Kept apart from daemon.py so that `ropoma send` starts without loading the server.
+
+
+def get_socket_file():
+    return utils.get_file("Robinhood.sock")
+
+
+def request(path, data, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(str(path))
+        client.sendall(json.dumps(data).encode() + b"\n")
+
+        with client.makefile("rb") as file:
+            line = file.readline()
+
+    if not line:
+        raise Exception(f"No response from {path}.")
+
+    return json.loads(line)
@@ -0,0 +1,245 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import os
+import json
+import time
+import logging
+import threading
+import socketserver
+from . import client
+from . import session
+from . import positions
+
+
+QUOTE_INTERVAL = 15
+POSITION_INTERVAL = 300
+ALLOCATION_INTERVAL = 2
+
+
+class Portfolio(object):
+
+    def __init__(self, robinhood, quote_interval=QUOTE_INTERVAL, position_interval=POSITION_INTERVAL, allocation_interval=ALLOCATION_INTERVAL):
+        self.robinhood = robinhood
+        self.quote_interval = quote_interval
+        self.position_interval = position_interval
+        self.allocation_interval = allocation_interval
+        # Commands and refreshes share the Robinhood session and snapshot, so they run one at a time.
+        self.lock = threading.RLock()
+        self.orders_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.account = None
+        self.symbols = []
+        self.investments = positions.Positions()
+        self.updated = {"positions": 0.0, "quotes": 0.0}
+        self.allocation_stat = None
+
+
+    def refresh_positions(self):
+        with self.lock:
+            # Refresh the session from the stored refresh token before the access token runs out.
+            if self.robinhood.tokens and not session.is_fresh(self.robinhood.tokens, session.REFRESH_MARGIN):
+                self.robinhood.login = None
+
+            self.account = self.robinhood.get_snapshot(max_age=0)
+            self.symbols = self.robinhood._get_position_symbols(self.account.positions)
+            self.updated["positions"] = time.time()
+            self.refresh_quotes()
+
+
+    def refresh_quotes(self):
+        with self.lock:
+            if self.account is None:
+                return self.refresh_positions()
+
+            # Between position refreshes only prices move, which costs one batched quotes request.
+            prices = self.robinhood._get_latest_prices(list(dict.fromkeys(self.symbols))) if self.symbols else {}
+            self.investments = self.robinhood._get_investments(self.account, self.symbols, prices, repriced=True)
+            self.updated["quotes"] = time.time()
+
+
+    def check_allocation(self):
+        path = self.robinhood._find_allocation_file()
+        if path is None:
+            return
+
+        stat = os.stat(path)
+
+        if (stat.st_mtime_ns, stat.st_size) != self.allocation_stat:
+            changed = self.allocation_stat is not None
+            self.allocation_stat = (stat.st_mtime_ns, stat.st_size)
+
+            try:
+                # Parsed now so the next command finds it in the allocation cache.
+                self.robinhood._load_allocation()
+            except Exception:
+                return
+
+            if changed:
+                self.robinhood._log(logging.INFO, f"{path.name} changed, allocation reloaded.")
+
+
+    def start(self):
+        self.refresh_positions()
+        self.check_allocation()
+        self.thread = threading.Thread(target=self._run, name="Portfolio", daemon=True)
+        self.thread.start()
+
+
+    def stop(self):
+        self.stopped.set()
+
+
+    def _run(self):
+        next_allocation = time.time()
+
+        while not self.stopped.wait(1):
+            now = time.time()
+
+            try:
+                if now >= next_allocation:
+                    self.check_allocation()
+                    next_allocation = now + self.allocation_interval
+
+                if now - self.updated["positions"] >= self.position_interval:
+                    self.refresh_positions()
+                elif now - self.updated["quotes"] >= self.quote_interval:
+                    self.refresh_quotes()
+            except Exception as exception:
+                self.robinhood._log(logging.WARNING, f"Portfolio refresh failed: {exception}")
+
+
+    def _positions_stale(self, future):
+        # Picked up by the refresh loop within a second. Orders settling together cost a single refresh.
+        self.updated["positions"] = 0.0
+
+
+    def _after_orders(self, results, sim):
+        if not sim:
+            for result in results:
+                if result.ok and isinstance(result.response, dict) and "id" in result.response:
+                    self.robinhood.tracker.track(result.response).add_done_callback(self._positions_stale)
+
+        return [result.as_dict() for result in results]
+
+
+    def execute(self, request):
+        command = request.get("command")
+        sim = bool(request.get("sim", False))
+
+        if command == "report":
+            return {"investments": dict(self.investments), "buying_power": self.account.buying_power, "updated": self.updated}
+
+        if command == "status":
+            return {"pid": os.getpid(), "updated": self.updated, "positions": len(self.symbols), "metrics": self.robinhood.metrics.summary()["api"]}
+
+        with self.lock:
+            if command == "get_new_investments":
+                return self.robinhood.get_new_investments()
+
+            if command == "refresh":
+                self.refresh_positions()
+                return {"updated": self.updated}
+
+            if command == "cancel":
+                summary = self.robinhood.cancel_open_orders(request.get("side", "all"), sim, request.get("symbols"), request.get("instruments"), request.get("older_than"))
+                if summary.cancelled and not sim:
+                    self.refresh_positions()
+                return summary._asdict()
+
+            if command not in ("sell_all", "rebalance"):
+                raise Exception(f"Unknown command {command}.")
+
+        # One order command at a time. The portfolio lock is only held while it plans and sends the sells, so while
+        # buys wait for sells to fill and orders settle, refreshes and commands, cancels of these orders in particular,
+        # go on.
+        with self.orders_lock:
+            with self.lock:
+                # Orders are never planned from positions older than the current call.
+                self.refresh_positions()
+
+                if command == "sell_all":
+                    results = self.robinhood.sell_all_stocks(sim)
+                else:
+                    started = self.robinhood._start_rebalance(sim)
+
+            if command == "rebalance":
+                results = self.robinhood._finish_rebalance(started, sim)
+
+        return {"orders": self._after_orders(results, sim)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            start = time.perf_counter()
+
+            try:
+                request = json.loads(line)
+                if request.get("command") == "stop":
+                    response = {"ok": True, "result": {}}
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    response = {"ok": True, "result": self.server.portfolio.execute(request)}
+            except Exception as exception:
+                response = {"ok": False, "error": str(exception)}
+
+            response["ms"] = (time.perf_counter() - start) * 1000
+            self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+            self.wfile.flush()
+
+
+def serve(robinhood, path=None, **kwargs):
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        message = "ropoma serve requires Unix domain sockets, which are not available on this platform."
+        robinhood._log(logging.ERROR, message)
+        raise Exception(message)
+
+    path = str(path or client.get_socket_file())
+    if os.path.exists(path):
+        try:
+            client.request(path, {"command": "status"}, timeout=1)
+        except OSError:
+            os.unlink(path)
+        else:
+            message = f"ropoma serve is already running on {path}."
+            robinhood._log(logging.ERROR, message)
+            raise Exception(message)
+
+    portfolio = Portfolio(robinhood, **kwargs)
+    portfolio.start()
+
+    # Anyone who can open the socket can place orders, so it is only accessible by its owner.
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    finally:
+        os.umask(umask)
+
+    server.daemon_threads = True
+    server.portfolio = portfolio
+    robinhood._log(logging.INFO, f"Serving on {path}.")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        portfolio.stop()
+        server.server_close()
+        os.unlink(path)
+        robinhood._log(logging.INFO, "Server stopped.")
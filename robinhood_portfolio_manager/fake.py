@@ -0,0 +1,442 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import copy
+import json
+import time
+import uuid
+import random
+import datetime
+import functools
+import threading
+import collections
+
+
+API_URL = "https://api.robinhood.com/"
+OPEN_STATES = ("unconfirmed", "queued", "confirmed", "partially_filled")
+THROTTLED = {"detail": "Request was throttled. Expected available in 1 second."}
+
+
+def _timestamp(seconds=None):
+    moment = datetime.datetime.fromtimestamp(time.time() if seconds is None else seconds, datetime.timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _filter(data, info):
+    if info is None or data is None:
+        return data
+
+    if isinstance(data, list):
+        return [item[info] if item else None for item in data]
+
+    return data.get(info)
+
+
+def _symbols(input_symbols):
+    if isinstance(input_symbols, str):
+        input_symbols = [input_symbols]
+
+    return list(dict.fromkeys(symbol.upper().strip() for symbol in input_symbols))
+
+
+def _api(function):
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        injected = self.backend._enter(f"{type(self).__name__.lower()}.{function.__name__}")
+        if injected:
+            return injected[0]
+
+        return function(self, *args, **kwargs)
+
+    return wrapper
+
+
+def generate(positions=10, watchlist=None, open_orders=0, buying_power=1000.0, seed=0):
+    rng = random.Random(seed)
+    watchlist = positions if watchlist is None else watchlist
+    count = max(positions, watchlist)
+    data = {"instruments": {}, "quotes": {}, "positions": [], "orders": []}
+
+    for index in range(count):
+        symbol = f"SYM{index}"
+        instrument_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        url = f"{API_URL}instruments/{instrument_id}/"
+        price = round(rng.uniform(5, 500), 4)
+        data["instruments"][url] = {"url": url, "id": instrument_id, "symbol": symbol, "margin_initial_ratio": rng.choice(["0.5000", "0.7500", "1.0000"]), "tradeable": True}
+        data["quotes"][symbol] = {"symbol": symbol, "instrument": url, "last_trade_price": f"{price:.4f}", "last_extended_hours_trade_price": None}
+
+    symbols = list(data["quotes"])
+    market_value = 0.0
+
+    for symbol in symbols[:positions]:
+        quote = data["quotes"][symbol]
+        shares = round(rng.uniform(0.1, 20), 6)
+        market_value += shares * float(quote["last_trade_price"])
+        data["positions"].append({"instrument": quote["instrument"], "quantity": f"{shares:.8f}", "shares_available_for_exercise": f"{shares:.8f}", "shares_held_for_options_collateral": "0.00000000"})
+
+    for index in range(open_orders):
+        symbol = symbols[index % count]
+        created = time.time() - rng.uniform(60, 3 * 24 * 60 * 60)
+        data["orders"].append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "instrument": data["quotes"][symbol]["instrument"],
+            "side": rng.choice(["buy", "sell"]),
+            "state": "confirmed",
+            "type": "market",
+            "quantity": "1.00000000",
+            "cumulative_quantity": "0.00000000",
+            "price": data["quotes"][symbol]["last_trade_price"],
+            "average_price": None,
+            "created_at": _timestamp(created),
+            "updated_at": _timestamp(created),
+            "fill_at": None
+        })
+
+    data["watchlists"] = {"Portfolio": {"results": [{"symbol": symbol} for symbol in symbols[:watchlist]]}}
+    data["account_profile"] = {"account_number": "FAKE0001", "type": "margin", "buying_power": f"{buying_power:.4f}", "cash": f"{buying_power:.4f}"}
+    data["portfolio_profile"] = {
+        "equity": f"{market_value + buying_power:.4f}",
+        "extended_hours_equity": None,
+        "extended_hours_portfolio_equity": None,
+        "market_value": f"{market_value:.4f}",
+        "extended_hours_market_value": None
+    }
+    return data
+
+
+def record(backend, path, watchlist="Portfolio"):
+    positions = backend.account.get_open_stock_positions()
+    portfolio = backend.account.get_watchlist_by_name(watchlist) or {"results": []}
+    urls = [position["instrument"] for position in positions]
+    instruments = {url: backend.stocks.get_instrument_by_url(url) for url in urls}
+    symbols = [instrument["symbol"] for instrument in instruments.values()] + [item["symbol"] for item in portfolio["results"]]
+    quotes = [quote for quote in backend.stocks.get_quotes(list(dict.fromkeys(symbols))) if quote]
+
+    for quote in quotes:
+        if quote["instrument"] not in instruments:
+            instruments[quote["instrument"]] = backend.stocks.get_instrument_by_url(quote["instrument"])
+
+    data = {
+        "account_profile": backend.profiles.load_account_profile(),
+        "portfolio_profile": backend.profiles.load_portfolio_profile(),
+        "positions": positions,
+        "instruments": instruments,
+        "quotes": {quote["symbol"]: quote for quote in quotes},
+        "watchlists": {watchlist: {"results": [{"symbol": item["symbol"]} for item in portfolio["results"]]}},
+        "orders": [dict(order, fill_at=None) for order in backend.orders.get_all_open_stock_orders()]
+    }
+
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+    return data
+
+
+class Namespace(object):
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.data = backend.data
+
+
+class Authentication(Namespace):
+
+    @_api
+    def login(self, username=None, password=None, expiresIn=86400, scope="internal", store_session=True, mfa_code=None, pickle_path="", pickle_name=""):
+        self.backend.logged_in = True
+        return {"access_token": uuid.uuid4().hex, "refresh_token": uuid.uuid4().hex, "token_type": "Bearer", "expires_in": expiresIn, "scope": scope}
+
+
+    @_api
+    def logout(self):
+        self.backend.logged_in = False
+
+
+class Profiles(Namespace):
+
+    @_api
+    def load_account_profile(self, account_number=None, info=None, dataType="indexzero"):
+        return _filter(copy.deepcopy(self.data["account_profile"]), info)
+
+
+    @_api
+    def load_portfolio_profile(self, info=None):
+        return _filter(copy.deepcopy(self.data["portfolio_profile"]), info)
+
+
+class Account(Namespace):
+
+    @_api
+    def get_open_stock_positions(self, account_number=None, info=None):
+        return _filter(copy.deepcopy(self.data["positions"]), info)
+
+
+    @_api
+    def get_watchlist_by_name(self, name="My First List", info=None):
+        watchlist = self.data["watchlists"].get(name)
+        return _filter(copy.deepcopy(watchlist), info) if watchlist else {}
+
+
+class Stocks(Namespace):
+
+    @_api
+    def get_quotes(self, inputSymbols, info=None):
+        return _filter([copy.deepcopy(self.data["quotes"].get(symbol)) for symbol in _symbols(inputSymbols)], info)
+
+
+    @_api
+    def get_latest_price(self, inputSymbols, priceType=None, includeExtendedHours=True):
+        quotes = [self.data["quotes"].get(symbol) for symbol in _symbols(inputSymbols)]
+        return [(quote["last_extended_hours_trade_price"] or quote["last_trade_price"]) if quote else None for quote in quotes]
+
+
+    @_api
+    def get_instrument_by_url(self, url, info=None):
+        return _filter(copy.deepcopy(self.data["instruments"].get(url)), info)
+
+
+    @_api
+    def find_instrument_data(self, query):
+        return [copy.deepcopy(instrument) for instrument in self.data["instruments"].values() if instrument["symbol"] == query.upper()]
+
+
+class Orders(Namespace):
+
+    def _state(self, order):
+        if order["state"] in OPEN_STATES and order["fill_at"] is not None and time.time() >= order["fill_at"]:
+            order["state"] = "filled"
+            order["cumulative_quantity"] = order["quantity"]
+            order["average_price"] = order["price"]
+            order["updated_at"] = _timestamp(order["fill_at"])
+
+        order["cancel"] = f"{API_URL}orders/{order['id']}/cancel/" if order["state"] in OPEN_STATES else None
+        return order
+
+
+    def _public(self, order):
+        return {key: value for key, value in copy.deepcopy(self._state(order)).items() if key != "fill_at"}
+
+
+    def _place(self, symbol, side, quantity=None, amount=None):
+        quote = self.data["quotes"].get(symbol.upper())
+        if not quote:
+            return None
+
+        price = float(quote["last_extended_hours_trade_price"] or quote["last_trade_price"])
+        quantity = quantity if quantity is not None else round(amount / price, 6)
+        now = time.time()
+        order = {
+            "id": str(uuid.uuid4()),
+            "instrument": quote["instrument"],
+            "side": side,
+            "state": "confirmed" if self.backend.market_open else "queued",
+            "type": "market",
+            "quantity": f"{quantity:.8f}",
+            "cumulative_quantity": "0.00000000",
+            "price": f"{price:.4f}",
+            "average_price": None,
+            "created_at": _timestamp(now),
+            "updated_at": _timestamp(now),
+            "fill_at": None if self.backend.fill_delay is None or not self.backend.market_open else now + self.backend.fill_delay
+        }
+
+        with self.backend.lock:
+            self.data["orders"].append(order)
+
+        return self._public(order)
+
+
+    def _find(self, order_id):
+        for order in self.data["orders"]:
+            if order["id"] == order_id:
+                return order
+
+        return None
+
+
+    @_api
+    def order_buy_fractional_by_price(self, symbol, amountInDollars, account_number=None, timeInForce="gfd", extendedHours=False, jsonify=True, market_hours="regular_hours"):
+        return self._place(symbol, "buy", amount=amountInDollars)
+
+
+    @_api
+    def order_sell_fractional_by_price(self, symbol, amountInDollars, account_number=None, timeInForce="gfd", extendedHours=False, jsonify=True):
+        return self._place(symbol, "sell", amount=amountInDollars)
+
+
+    @_api
+    def order_sell_fractional_by_quantity(self, symbol, quantity, account_number=None, timeInForce="gfd", priceType="bid_price", extendedHours=False, jsonify=True, market_hours="regular_hours"):
+        return self._place(symbol, "sell", quantity=quantity)
+
+
+    @_api
+    def cancel_stock_order(self, orderID):
+        order = self._find(orderID)
+        if not order:
+            return None
+
+        with self.backend.lock:
+            if self._state(order)["state"] not in OPEN_STATES:
+                return {"detail": "This order can no longer be cancelled."}
+
+            order["state"] = "cancelled"
+            order["updated_at"] = _timestamp()
+
+        return {}
+
+
+    @_api
+    def get_all_open_stock_orders(self, info=None, account_number=None):
+        return _filter([self._public(order) for order in self.data["orders"] if self._state(order)["state"] in OPEN_STATES], info)
+
+
+    @_api
+    def get_all_stock_orders(self, info=None, account_number=None, start_date=None):
+        orders = [self._public(order) for order in self.data["orders"]]
+        return _filter([order for order in orders if not start_date or order["updated_at"] >= start_date], info)
+
+
+    @_api
+    def get_stock_order_info(self, orderID):
+        order = self._find(orderID)
+        return self._public(order) if order else None
+
+
+class Helper(Namespace):
+
+    @_api
+    def request_get(self, url, dataType="regular", payload=None, jsonify_data=True):
+        payload = payload or {}
+
+        if url.startswith(f"{API_URL}instruments/"):
+            ids = payload.get("ids", "").split(",")
+            results = [copy.deepcopy(instrument) for instrument in self.data["instruments"].values() if instrument["id"] in ids]
+        elif url.startswith(f"{API_URL}orders/"):
+            query = dict(part.split("=", 1) for part in url.partition("?")[2].split("&") if "=" in part)
+            updated = payload.get("updated_at[gte]") or query.get("updated_at[gte]")
+            orders = [self.backend.orders._public(order) for order in self.data["orders"]]
+            results = [order for order in orders if not updated or order["updated_at"] >= updated]
+        elif url.startswith(f"{API_URL}positions/"):
+            # Tokens listed as revoked are refused, the way Robinhood refuses a token it no longer accepts.
+            if self.backend.headers.get("Authorization", "").partition(" ")[2] in self.backend.revoked:
+                return [None] if dataType in ("results", "pagination") else None
+            results = copy.deepcopy(self.data["positions"])
+        else:
+            return None
+
+        return results if dataType in ("results", "pagination") else {"results": results, "next": None}
+
+
+    @_api
+    def request_post(self, url, payload=None, timeout=16, json=False, jsonify_data=True):
+        payload = payload or {}
+
+        if url.startswith(f"{API_URL}oauth2/token/") and payload.get("grant_type") == "refresh_token":
+            self.backend.logged_in = True
+            return {"access_token": uuid.uuid4().hex, "refresh_token": uuid.uuid4().hex, "token_type": "Bearer", "expires_in": payload.get("expires_in", 86400), "scope": payload.get("scope", "internal")}
+
+        return None
+
+
+    def update_session(self, key, value):
+        self.backend.headers[key] = value
+
+
+    def set_login_state(self, logged_in):
+        self.backend.logged_in = logged_in
+
+
+class Urls(object):
+
+    def login_url(self):
+        return f"{API_URL}oauth2/token/"
+
+
+    def positions_url(self, account_number=None):
+        return f"{API_URL}positions/"
+
+
+    def instruments_url(self, *args, **kwargs):
+        return f"{API_URL}instruments/"
+
+
+    def orders_url(self, orderID=None, account_number=None, start_date=None):
+        url = f"{API_URL}orders/"
+        if orderID:
+            url += f"{orderID}/"
+        if start_date:
+            url += f"?updated_at[gte]={start_date}"
+        return url
+
+
+class FakeBackend(object):
+
+    def __init__(self, data=None, latency=0.0, failures=None, throttles=None, fill_delay=0.0, seed=0, market_open=True):
+        self.data = copy.deepcopy(data if data is not None else generate())
+        self.latency = latency
+        self.failures = failures or {}
+        self.throttles = throttles or {}
+        self.fill_delay = fill_delay
+        # While the market is closed, orders are queued and don't fill.
+        self.market_open = market_open
+        self.random = random.Random(seed)
+        self.calls = collections.Counter()
+        self.lock = threading.RLock()
+        self.logged_in = False
+        self.headers = {}
+        self.revoked = set()
+
+        self.authentication = Authentication(self)
+        self.profiles = Profiles(self)
+        self.account = Account(self)
+        self.stocks = Stocks(self)
+        self.orders = Orders(self)
+        self.helper = Helper(self)
+        self.urls = Urls()
+
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as file:
+            return cls(json.load(file), **kwargs)
+
+
+    def _enter(self, name):
+        with self.lock:
+            self.calls[name] += 1
+            failed = self.random.random() < self.failures.get(name, 0)
+            throttled = self.random.random() < self.throttles.get(name, 0)
+
+        latency = self.latency.get(name, 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency:
+            time.sleep(latency)
+
+        if failed:
+            return (None,)
+
+        if throttled:
+            return (copy.deepcopy(THROTTLED),)
+
+        return ()
+
+
+    @property
+    def call_count(self):
+        return sum(self.calls.values())
+
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls.clear()
@@ -0,0 +1,160 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import sqlite3
+import threading
+import collections
+from . import utils
+
+
+ORDER_FIELDS = ("id", "symbol", "instrument", "side", "state", "type", "quantity", "cumulative_quantity", "average_price", "fees", "created_at", "updated_at")
+# Orders with an executed quantity, whatever their final state: a partially filled order that was cancelled still traded.
+EXECUTED = "cumulative_quantity > 0"
+
+
+def _float(value):
+    return float(value) if value not in (None, "") else None
+
+
+class HistoryStore(object):
+
+    def __init__(self, path=None):
+        self.path = path or utils.get_file("Robinhood.history.sqlite")
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS orders (id TEXT PRIMARY KEY, symbol TEXT, instrument TEXT, side TEXT, state TEXT, type TEXT, quantity REAL, cumulative_quantity REAL, average_price REAL, fees REAL, created_at TEXT, updated_at TEXT);
+            CREATE INDEX IF NOT EXISTS orders_created_at ON orders (created_at);
+            CREATE INDEX IF NOT EXISTS orders_symbol ON orders (symbol, created_at);
+            CREATE TABLE IF NOT EXISTS positions (taken_at TEXT, symbol TEXT, quantity REAL, average_buy_price REAL, price REAL, equity REAL, PRIMARY KEY (taken_at, symbol));
+            CREATE INDEX IF NOT EXISTS positions_symbol ON positions (symbol, taken_at);
+            CREATE TABLE IF NOT EXISTS cursor (name TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.connection.commit()
+
+
+    def get_cursor(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM cursor WHERE name = ?", (name,)).fetchone()
+
+        return row[0] if row else None
+
+
+    def add_orders(self, orders, symbols):
+        # Orders change state after they are first seen, so a later sync replaces the stored row.
+        rows = [(
+            order["id"],
+            symbols.get(order["instrument"]),
+            order["instrument"],
+            order.get("side"),
+            order.get("state"),
+            order.get("type"),
+            _float(order.get("quantity")),
+            _float(order.get("cumulative_quantity")) or 0.0,
+            _float(order.get("average_price")),
+            _float(order.get("fees")) or 0.0,
+            order.get("created_at"),
+            order.get("updated_at")
+        ) for order in orders]
+
+        with self.lock:
+            before = self.connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+            self.connection.executemany(f"INSERT OR REPLACE INTO orders VALUES ({', '.join('?' * len(ORDER_FIELDS))})", rows)
+            new = self.connection.execute("SELECT COUNT(*) FROM orders").fetchone()[0] - before
+
+            updated = max((row[11] for row in rows if row[11]), default=None)
+            cursor = self.connection.execute("SELECT value FROM cursor WHERE name = 'orders'").fetchone()
+            if updated and (cursor is None or updated > cursor[0]):
+                self.connection.execute("INSERT OR REPLACE INTO cursor VALUES ('orders', ?)", (updated,))
+
+            self.connection.commit()
+
+        return new
+
+
+    def add_positions(self, taken_at, positions):
+        rows = [(taken_at, symbol, quantity, average_buy_price, price, equity) for symbol, quantity, average_buy_price, price, equity in positions]
+
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.connection.execute("INSERT OR REPLACE INTO cursor VALUES ('positions', ?)", (taken_at,))
+            self.connection.commit()
+
+        return len(rows)
+
+
+    def _range(self, start=None, end=None, symbol=None):
+        clauses = [EXECUTED]
+        values = []
+
+        for clause, value in (("created_at >= ?", start), ("created_at < ?", end), ("symbol = ?", symbol)):
+            if value is not None:
+                clauses.append(clause)
+                values.append(value)
+
+        return " AND ".join(clauses), values
+
+
+    def turnover(self, start=None, end=None, symbol=None):
+        where, values = self._range(start, end, symbol)
+
+        with self.lock:
+            rows = self.connection.execute(f"SELECT side, SUM(cumulative_quantity * average_price) FROM orders WHERE {where} GROUP BY side", values).fetchall()
+
+        turnover = {"buy": 0.0, "sell": 0.0}
+        turnover.update({side: amount or 0.0 for side, amount in rows})
+        turnover["total"] = turnover["buy"] + turnover["sell"]
+        return turnover
+
+
+    def trade_counts(self, start=None, end=None, symbol=None):
+        where, values = self._range(start, end, symbol)
+
+        with self.lock:
+            rows = self.connection.execute(f"SELECT symbol, side, COUNT(*) FROM orders WHERE {where} GROUP BY symbol, side ORDER BY symbol", values).fetchall()
+
+        counts = collections.OrderedDict()
+        for symbol, side, count in rows:
+            counts.setdefault(symbol, {"buy": 0, "sell": 0})[side] = count
+
+        return counts
+
+
+    def realized_pnl(self, start=None, end=None, symbol=None):
+        # Average cost per symbol, built from every fill up to the end of the period. Shares held before the first
+        # synced order have no known cost, so the part of a sell beyond the known shares adds no profit or loss.
+        where, values = self._range(None, end, symbol)
+
+        with self.lock:
+            rows = self.connection.execute(f"SELECT symbol, side, cumulative_quantity, average_price, fees, created_at FROM orders WHERE {where} ORDER BY symbol, created_at", values).fetchall()
+
+        pnl = collections.OrderedDict()
+        holdings = {}
+
+        for symbol, side, quantity, price, fees, created_at in rows:
+            shares, cost = holdings.get(symbol, (0.0, 0.0))
+
+            if side == "buy":
+                holdings[symbol] = (shares + quantity, cost + quantity * price + fees)
+                continue
+
+            sold = min(quantity, shares)
+            average = cost / shares if shares > 0 else price
+            holdings[symbol] = (shares - sold, cost - average * sold)
+
+            if start is None or created_at >= start:
+                pnl[symbol] = pnl.get(symbol, 0.0) + sold * (price - average) - fees
+
+        return pnl
@@ -0,0 +1,117 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import os
+import json
+import queue
+import atexit
+import logging
+import datetime
+import threading
+import logging.handlers
+from . import utils
+
+
+LOGGER = "robinhood_portfolio_manager"
+AUDIT_LOGGER = "robinhood_portfolio_manager.audit"
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+_listener = None
+_handlers = []
+_files = None
+_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        data = {"time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(), "event": record.getMessage()}
+        data.update(getattr(record, "audit", {}))
+        return json.dumps(data, default=str)
+
+
+def _stop():
+    global _listener, _files
+
+    # A forked process inherits the listener without its thread, so only the process that started it stops it.
+    if _listener is not None and _files[0] == os.getpid():
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+
+    for logger, handler in _handlers:
+        logger.removeHandler(handler)
+
+    _handlers.clear()
+    _listener = None
+    _files = None
+
+
+def stop():
+    with _lock:
+        _stop()
+
+
+def configure(log_file=None, audit_file=None, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+    global _listener, _files
+
+    with _lock:
+        logger = logging.getLogger(LOGGER)
+        files = (os.getpid(), str(log_file or utils.get_file("Robinhood.log")), str(audit_file or utils.get_file("Robinhood.audit.jsonl")))
+
+        # Without explicit files the current configuration is kept. Other files, or a new process, start it over.
+        if _listener is not None and _files[0] == files[0] and (files == _files or (log_file is None and audit_file is None)):
+            return logger
+
+        _stop()
+        atexit.unregister(stop)
+        atexit.register(stop)
+
+        file_handler = logging.handlers.RotatingFileHandler(files[1], maxBytes=max_bytes, backupCount=backup_count)
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        file_handler.addFilter(lambda record: record.name != AUDIT_LOGGER)
+
+        audit_handler = logging.handlers.RotatingFileHandler(files[2], maxBytes=max_bytes, backupCount=backup_count)
+        audit_handler.setFormatter(JSONFormatter())
+        audit_handler.addFilter(lambda record: record.name == AUDIT_LOGGER)
+
+        # Files are written by the listener thread so callers, the order loop in particular, never wait on the disk.
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, file_handler, audit_handler, respect_handler_level=True)
+        _listener.start()
+        _files = files
+
+        # The console stays synchronous so log lines keep their order with the CLI's own output.
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.DEBUG)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        audit_logger = logging.getLogger(AUDIT_LOGGER)
+        _handlers.extend([(logger, logging.handlers.QueueHandler(records)), (logger, stream_handler), (audit_logger, logging.handlers.QueueHandler(records))])
+
+        logger.setLevel(logging.DEBUG)
+        audit_logger.setLevel(logging.INFO)
+        audit_logger.propagate = False
+
+        for target, handler in _handlers:
+            target.addHandler(handler)
+
+        return logger
+
+
+def audit(event, **fields):
+    logging.getLogger(AUDIT_LOGGER).info(event, extra={"audit": fields})
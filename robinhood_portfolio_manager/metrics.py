@@ -0,0 +1,265 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import os
+import json
+import time
+import functools
+import threading
+import contextlib
+import collections
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NAMESPACES = ("authentication", "profiles", "account", "stocks", "orders", "options", "markets", "helper", "export")
+# Local helpers of robin_stocks that don't send a request.
+NOT_API = ("helper.update_session", "helper.set_login_state", "helper.get_output", "helper.set_output")
+
+
+class Histogram(object):
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class Metrics(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.calls = collections.Counter()
+        self.errors = collections.Counter()
+        self.retries = collections.Counter()
+        self.bytes = collections.Counter()
+        self.latency = collections.defaultdict(Histogram)
+        self.counters = collections.Counter()
+        self.phases = []
+        self.local = threading.local()
+
+
+    def observe(self, name, seconds, size=0, error=False):
+        with self.lock:
+            self.calls[name] += 1
+            self.latency[name].observe(seconds)
+            self.bytes[name] += size
+            if error:
+                self.errors[name] += 1
+
+
+    def retry(self, name, count=1):
+        if count:
+            with self.lock:
+                self.retries[name] += count
+
+
+    def add(self, name, value):
+        with self.lock:
+            self.counters[name] += value
+
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        start = time.perf_counter()
+        entry = [name, depth, time.time() - self.started, None]
+
+        with self.lock:
+            self.phases.append(entry)
+
+        try:
+            yield
+        finally:
+            entry[3] = time.perf_counter() - start
+            self.local.depth = depth
+
+
+    def summary(self):
+        with self.lock:
+            return {
+                "started": self.started,
+                "duration": time.time() - self.started,
+                "api": {
+                    name: {
+                        "calls": self.calls[name],
+                        "errors": self.errors[name],
+                        "retries": self.retries[name],
+                        "bytes": self.bytes[name],
+                        "seconds": self.latency[name].sum,
+                        "latency_buckets": dict(zip(map(str, BUCKETS), self.latency[name].buckets))
+                    } for name in sorted(self.calls)
+                },
+                "retries": dict(self.retries),
+                "counters": dict(self.counters),
+                "phases": [{"phase": name, "depth": depth, "offset": offset, "seconds": seconds} for name, depth, offset, seconds in self.phases]
+            }
+
+
+    def prometheus(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP ropoma_{name} {help_text}")
+            lines.append(f"# TYPE ropoma_{name} {kind}")
+            lines.extend(f"ropoma_{name}{labels} {value}" for labels, value in samples)
+
+        with self.lock:
+            names = sorted(self.calls)
+            metric("api_calls_total", "counter", "Robinhood API calls.", [(f'{{call="{name}"}}', self.calls[name]) for name in names])
+            metric("api_errors_total", "counter", "Robinhood API calls that failed or returned nothing.", [(f'{{call="{name}"}}', self.errors[name]) for name in names])
+            metric("api_response_bytes_total", "counter", "Approximate JSON size of Robinhood API responses.", [(f'{{call="{name}"}}', self.bytes[name]) for name in names])
+            metric("api_retries_total", "counter", "Robinhood API calls retried after throttling or errors.", [(f'{{call="{name}"}}', count) for name, count in sorted(self.retries.items())])
+
+            samples = []
+            for name in names:
+                histogram = self.latency[name]
+                samples.extend((f'_bucket{{call="{name}",le="{bound}"}}', count) for bound, count in zip(BUCKETS, histogram.buckets))
+                samples.append((f'_bucket{{call="{name}",le="+Inf"}}', histogram.count))
+                samples.append((f'_sum{{call="{name}"}}', histogram.sum))
+                samples.append((f'_count{{call="{name}"}}', histogram.count))
+            metric("api_call_duration_seconds", "histogram", "Latency of Robinhood API calls.", samples)
+
+            totals = collections.Counter()
+            for name, depth, offset, seconds in self.phases:
+                totals[name] += seconds or 0.0
+            metric("phase_duration_seconds", "gauge", "Time spent in each Robinhood method during the last run.", [(f'{{phase="{name}"}}', seconds) for name, seconds in sorted(totals.items())])
+            metric("counter_total", "counter", "Other run counters.", [(f'{{name="{name}"}}', value) for name, value in sorted(self.counters.items())])
+            metric("last_run_timestamp_seconds", "gauge", "Start of the last run.", [("", self.started)])
+
+        return "\n".join(lines) + "\n"
+
+
+    def write(self, json_path, prometheus_path):
+        # Written to a temporary file and renamed so the textfile collector never reads a partial file.
+        for path, content in ((json_path, json.dumps(self.summary(), indent=2)), (prometheus_path, self.prometheus())):
+            temporary = f"{path}.tmp"
+            with open(temporary, "w") as file:
+                file.write(content)
+            os.replace(temporary, path)
+
+
+    def profile(self):
+        lines = [f"{'phase':<40}{'start s':>10}{'seconds':>10}"]
+        lines.extend(f"{'  ' * depth + name:<40}{offset:>10.3f}{seconds or 0.0:>10.3f}" for name, depth, offset, seconds in self.phases)
+        lines.append("")
+        lines.append(f"{'api call':<48}{'calls':>7}{'errors':>8}{'retries':>9}{'seconds':>10}{'kB':>10}")
+
+        for name, data in self.summary()["api"].items():
+            lines.append(f"{name:<48}{data['calls']:>7}{data['errors']:>8}{data['retries']:>9}{data['seconds']:>10.3f}{data['bytes'] / 1024:>10.1f}")
+
+        return "\n".join(lines)
+
+
+# Body bytes received by the current thread's API call, counted by a response hook on robin_stocks' session.
+_received = threading.local()
+
+
+def _count_received(response, *args, **kwargs):
+    _received.bytes = (getattr(_received, "bytes", None) or 0) + len(response.content)
+
+
+def _size(result):
+    # Backends without an HTTP session, the fake one, are measured by their JSON size.
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def instrument(function, name, metrics):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        _received.bytes = None
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            metrics.observe(name, time.perf_counter() - start, error=True)
+            raise
+
+        elapsed = time.perf_counter() - start
+        metrics.observe(name, elapsed, _size(result) if _received.bytes is None else _received.bytes, result is None)
+        return result
+
+    wrapper.metric_name = name
+    return wrapper
+
+
+class InstrumentedNamespace(object):
+
+    def __init__(self, namespace, name, metrics):
+        self._namespace = namespace
+        self._name = name
+        self._metrics = metrics
+        self._wrapped = {}
+
+
+    def __getattr__(self, attribute):
+        value = getattr(self._namespace, attribute)
+        name = f"{self._name}.{attribute}"
+
+        if not callable(value) or isinstance(value, type) or name[3:] in NOT_API:
+            return value
+
+        if attribute not in self._wrapped:
+            self._wrapped[attribute] = instrument(value, name, self._metrics)
+
+        return self._wrapped[attribute]
+
+
+class InstrumentedBackend(object):
+
+    def __init__(self, backend, metrics):
+        self._backend = backend
+        self._metrics = metrics
+        self._namespaces = {}
+
+        session = getattr(getattr(backend, "helper", None), "SESSION", None)
+        if session is not None and _count_received not in session.hooks["response"]:
+            session.hooks["response"].append(_count_received)
+
+
+    def __getattr__(self, attribute):
+        value = getattr(self._backend, attribute)
+
+        if attribute not in NAMESPACES:
+            return value
+
+        if attribute not in self._namespaces:
+            self._namespaces[attribute] = InstrumentedNamespace(value, f"rh.{attribute}", self._metrics)
+
+        return self._namespaces[attribute]
+
+
+def timed(function):
+    name = function.__name__.lstrip("_")
+
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        with self.metrics.phase(name):
+            return function(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,204 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import re
+import time
+import threading
+import collections
+import concurrent.futures
+
+
+Order = collections.namedtuple("Order", ["function", "args", "kwargs", "symbol", "side", "message"])
+
+
+class OrderResult(collections.namedtuple("OrderResult", ["order", "response", "error", "attempts", "elapsed", "finished"])):
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+    def as_dict(self):
+        response = self.response if isinstance(self.response, dict) else {}
+        return {"symbol": self.order.symbol, "side": self.order.side, "message": self.order.message, "ok": self.ok, "order_id": response.get("id"), "state": response.get("state"), "error": self.error}
+
+
+CancelSummary = collections.namedtuple("CancelSummary", ["cancelled", "filled", "failed"])
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def acquire(self):
+        waited = 0.0
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
+
+
+def _places(order):
+    # Cancellations can be repeated safely, placing an order can't.
+    return order.function.__name__.startswith("order_")
+
+
+class OrderEngine(object):
+
+    def __init__(self, rate_limit=1.0, burst=5, workers=4, retries=5, backoff=2.0, max_backoff=60.0, metrics=None, find=None):
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics
+        # Looks up an order that may have been placed despite a lost response: find(order, sent_at) -> order or None.
+        self.find = find
+        self.results = []
+        self.lock = threading.Lock()
+
+
+    def _read(self, response):
+        # Orders are placed with jsonify=False, so robin_stocks hands back the HTTP response and a 429 can be told apart
+        # from a request whose answer got lost. Dictionaries come from the fake and paper backends.
+        if hasattr(response, "status_code"):
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            return response.status_code, data, response.headers.get("Retry-After")
+
+        if isinstance(response, dict) and "throttled" in str(response.get("detail", "")).lower():
+            return 429, response, None
+
+        return (None if response is None else 200), response, None
+
+
+    def _throttle_delay(self, response, retry_after, attempt):
+        delay = self.backoff * (2 ** attempt)
+        match = re.search(r"(\d+) second", str(response.get("detail", ""))) if isinstance(response, dict) else None
+        wait = float(match.group(1)) if match else float(retry_after) if retry_after and retry_after.isdigit() else 0
+
+        return min(self.max_backoff, max(delay, wait))
+
+
+    def _submit(self, order):
+        start = time.monotonic()
+        response = None
+        error = None
+        attempts = 0
+
+        waited = 0.0
+        backoff = 0.0
+
+        while attempts <= self.retries:
+            waited += self.bucket.acquire()
+            attempts += 1
+
+            sent = time.time()
+
+            try:
+                response = order.function(*order.args, **order.kwargs)
+            except Exception as exception:
+                response, error = None, str(exception)
+                break
+
+            status, response, retry_after = self._read(response)
+
+            if status == 429:
+                error = response["detail"] if isinstance(response, dict) and response.get("detail") else "Request was throttled."
+                delay = self._throttle_delay(response, retry_after, attempts - 1)
+            elif status is None or status >= 500 or response is None:
+                error = "No response from Robinhood."
+                delay = min(self.max_backoff, self.backoff * (2 ** (attempts - 1)))
+
+                if _places(order):
+                    # The order may have reached Robinhood, and every call places a new one, so it is only sent again
+                    # once a lookup shows it wasn't placed.
+                    if self.find is None or attempts > self.retries:
+                        error += " The order may have been placed, so it was not sent again."
+                        break
+
+                    time.sleep(delay)
+                    backoff += delay
+
+                    try:
+                        placed = self.find(order, sent)
+                    except Exception as exception:
+                        error += f" The order may have been placed and could not be looked up: {exception}"
+                        break
+
+                    if placed:
+                        response, error = placed, None
+                        break
+
+                    continue
+            else:
+                error = None
+                break
+
+            if attempts <= self.retries:
+                time.sleep(delay)
+                backoff += delay
+
+        if error is None and isinstance(response, dict) and response.get("detail") and "id" not in response:
+            error = response["detail"]
+
+        if self.metrics:
+            self.metrics.retry(getattr(order.function, "metric_name", order.function.__name__), attempts - 1)
+            self.metrics.add("rate_limit_wait_seconds", waited)
+            self.metrics.add("retry_backoff_seconds", backoff)
+
+        finished = time.monotonic()
+        return OrderResult(order, response, error, attempts, finished - start, finished)
+
+
+    def _simulate(self, order):
+        start = time.monotonic()
+        response = order.function(*order.args, **order.kwargs)
+        error = response.get("detail") if isinstance(response, dict) and "id" not in response and response.get("detail") else None
+        finished = time.monotonic()
+        return OrderResult(order, response, error, 1, finished - start, finished)
+
+
+    def run(self, orders, sim=False):
+        if sim:
+            # Simulated orders go to the paper broker, which answers at once, so they are neither paced nor retried.
+            results = [self._simulate(order) for order in orders]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(self._submit, orders))
+
+        with self.lock:
+            self.results.extend(results)
+
+        return results
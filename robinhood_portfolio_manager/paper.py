@@ -0,0 +1,107 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import uuid
+import datetime
+import threading
+import collections
+
+
+def _timestamp():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def cancel_stock_order(orderID):
+    # Simulated cancellations leave the account's real open orders as they are.
+    return {}
+
+
+class PaperBroker(object):
+
+    # Takes the place of robin_stocks' orders module for simulations: orders fill at once at a fixed price per symbol
+    # and update the simulated account.
+    def __init__(self, buying_power=0.0, positions=None, prices=None, quote=None):
+        self.buying_power = float(buying_power)
+        self.positions = collections.Counter(positions or {})
+        self.prices = dict(prices or {})
+        self.quote = quote
+        self.orders = []
+        self.lock = threading.Lock()
+
+
+    def _price(self, symbol):
+        if symbol not in self.prices and self.quote:
+            self.prices.update(self.quote([symbol]))
+
+        return self.prices.get(symbol)
+
+
+    def _fill(self, symbol, side, quantity=None, amount=None):
+        symbol = symbol.upper()
+        price = self._price(symbol)
+
+        if not price:
+            return {"detail": f"No price for {symbol}."}
+
+        with self.lock:
+            quantity = quantity if quantity is not None else amount / price
+
+            if side == "sell":
+                quantity = min(quantity, self.positions[symbol])
+                if quantity <= 0:
+                    return {"detail": f"No shares of {symbol} to sell."}
+            elif quantity * price > self.buying_power + 1e-6:
+                return {"detail": "Not enough buying power."}
+
+            value = quantity * price
+            self.positions[symbol] += quantity if side == "buy" else -quantity
+            self.buying_power += value if side == "sell" else -value
+
+            if self.positions[symbol] <= 1e-9:
+                del self.positions[symbol]
+
+            now = _timestamp()
+            order = {"id": str(uuid.uuid4()), "symbol": symbol, "side": side, "state": "filled", "type": "market", "quantity": f"{quantity:.8f}", "cumulative_quantity": f"{quantity:.8f}", "price": f"{price:.4f}", "average_price": f"{price:.4f}", "created_at": now, "updated_at": now}
+            self.orders.append(order)
+
+        return dict(order)
+
+
+    def order_buy_fractional_by_price(self, symbol, amountInDollars, account_number=None, timeInForce="gfd", extendedHours=False, jsonify=True, market_hours="regular_hours"):
+        return self._fill(symbol, "buy", amount=amountInDollars)
+
+
+    def order_sell_fractional_by_price(self, symbol, amountInDollars, account_number=None, timeInForce="gfd", extendedHours=False, jsonify=True):
+        return self._fill(symbol, "sell", amount=amountInDollars)
+
+
+    def order_sell_fractional_by_quantity(self, symbol, quantity, account_number=None, timeInForce="gfd", priceType="bid_price", extendedHours=False, jsonify=True, market_hours="regular_hours"):
+        return self._fill(symbol, "sell", quantity=quantity)
+
+
+    def cancel_stock_order(self, orderID):
+        # Paper orders fill immediately, so the only orders left to cancel are the account's real open orders.
+        return cancel_stock_order(orderID)
+
+
+    def get_investments(self):
+        # Symbols that were never quoted, positions no order touched, count with no equity.
+        equities = {symbol: shares * (self.prices.get(symbol) or 0.0) for symbol, shares in self.positions.items()}
+        market_value = sum(equities.values())
+
+        return {
+            symbol: {"shares": self.positions[symbol], "price": self.prices.get(symbol), "equity": equity, "percentage": round(equity / market_value * 100, 2) if market_value else 0.0}
+            for symbol, equity in sorted(equities.items(), key=lambda item: -item[1])
+        }
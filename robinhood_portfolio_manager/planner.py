@@ -0,0 +1,150 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import collections
+import numpy as np
+from . import positions
+
+
+HOLD = 0
+BUY = 1
+SELL = 2
+EXIT = 3
+
+PlannedOrder = collections.namedtuple("PlannedOrder", ["symbol", "action", "amount", "shares", "target", "current"])
+
+
+class RebalancePlan(collections.namedtuple("RebalancePlan", ["symbols", "target_weights", "target_amounts", "current_equity", "available_shares", "prices", "deltas", "actions", "total", "banded"])):
+
+    __slots__ = ()
+
+    def _orders(self, mask):
+        indices = np.flatnonzero(mask)
+        actions = self.actions[indices]
+        exits = actions == EXIT
+        amounts = np.where(exits, self.current_equity[indices], np.abs(self.deltas[indices]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(exits, self.available_shares[indices], amounts / self.prices[indices])
+        columns = zip(indices.tolist(), actions.tolist(), amounts.tolist(), shares.tolist(), self.target_amounts[indices].tolist(), self.current_equity[indices].tolist())
+        return [PlannedOrder(self.symbols[index], *row) for index, *row in columns]
+
+
+    @property
+    def sells(self):
+        return self._orders((self.actions == SELL) | (self.actions == EXIT))
+
+
+    @property
+    def buys(self):
+        return self._orders(self.actions == BUY)
+
+
+    @property
+    def holds(self):
+        return self._orders((self.actions == HOLD) & ~np.isnan(self.target_weights))
+
+
+    @property
+    def order_count(self):
+        return int(np.count_nonzero(self.actions != HOLD))
+
+
+    @property
+    def avoided_count(self):
+        # Orders a full rebalance would have placed for symbols that stayed inside their drift band.
+        return int(np.count_nonzero(self.banded))
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+def plan(symbols, target_weights, current_equity, available_shares, prices, margin_ratios, buying_power, portfolio_value, absolute_band=0.0, relative_band=0.0, min_trade=0.0):
+    # Symbols that are held but not part of the allocation carry a NaN target weight and are sold in full.
+    # Bands and minimum trade sizes are scalars or one value per symbol. A targeted symbol trades only when its drift
+    # leaves an enabled band: absolute bands are a fraction of the allocated value, relative bands a fraction of the
+    # symbol's target amount.
+    target_weights = np.array(target_weights, dtype=np.float64)
+    current_equity = np.array(current_equity, dtype=np.float64)
+    available_shares = np.array(available_shares, dtype=np.float64)
+    prices = np.array(prices, dtype=np.float64)
+    margin_ratios = np.array(margin_ratios, dtype=np.float64)
+
+    targeted = ~np.isnan(target_weights)
+    target_amounts = np.where(targeted, ((buying_power + portfolio_value) * np.nan_to_num(target_weights)) / np.where(targeted, margin_ratios, 1.0), 0.0)
+    deltas = target_amounts - current_equity
+
+    absolute_band = np.broadcast_to(np.asarray(absolute_band, dtype=np.float64), deltas.shape)
+    relative_band = np.broadcast_to(np.asarray(relative_band, dtype=np.float64), deltas.shape)
+    min_trade = np.broadcast_to(np.asarray(min_trade, dtype=np.float64), deltas.shape)
+    drift = np.abs(deltas)
+    inside = (absolute_band > 0) | (relative_band > 0)
+    inside &= (absolute_band <= 0) | (drift <= absolute_band * (buying_power + portfolio_value))
+    inside &= (relative_band <= 0) | (drift <= relative_band * target_amounts)
+    banded = targeted & (deltas != 0) & (inside | (drift < min_trade))
+
+    actions = np.full(len(target_weights), HOLD, dtype=np.int8)
+    actions[targeted & (deltas > 0)] = BUY
+    actions[targeted & (deltas < 0)] = SELL
+    actions[banded] = HOLD
+    actions[~targeted & (available_shares > 0)] = EXIT
+
+    return RebalancePlan(
+        tuple(symbols),
+        _readonly(target_weights),
+        _readonly(target_amounts),
+        _readonly(current_equity),
+        _readonly(available_shares),
+        _readonly(prices),
+        _readonly(deltas),
+        _readonly(actions),
+        float(target_amounts.sum()),
+        _readonly(banded)
+    )
+
+
+def per_symbol(value, symbols):
+    if isinstance(value, dict):
+        return [value.get(symbol, 0.0) for symbol in symbols]
+
+    return value
+
+
+def plan_from_investments(new_investments, current_investments, margin_ratios, buying_power, portfolio_value, absolute_band=0.0, relative_band=0.0, min_trade=0.0):
+    if not isinstance(current_investments, positions.Positions):
+        data = [current_investments[symbol] for symbol in current_investments]
+        current_investments = positions.Positions(current_investments, [item["available_shares"] for item in data], [item["collateral_shares"] for item in data], [item["price"] for item in data])
+
+    symbols = list(new_investments) + [symbol for symbol in current_investments.symbols if symbol not in new_investments]
+    rows = current_investments.take(symbols)
+    held = rows >= 0
+
+    def column(values, missing):
+        return np.where(held, values[rows], missing) if len(values) else np.full(len(symbols), missing)
+
+    return plan(
+        symbols,
+        [new_investments.get(symbol, np.nan) for symbol in symbols],
+        column(current_investments.equity, 0.0),
+        column(current_investments.available_shares, 0.0),
+        column(current_investments.prices, np.nan),
+        [margin_ratios.get(symbol, 1.0) for symbol in symbols],
+        buying_power,
+        portfolio_value,
+        per_symbol(absolute_band, symbols),
+        per_symbol(relative_band, symbols),
+        per_symbol(min_trade, symbols)
+    )
@@ -0,0 +1,176 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import os
+import json
+import math
+import time
+import pathlib
+from . import tracker
+
+
+VERSION = 1
+FILE_NAME = "Robinhood.plan.json"
+EXPIRY = 12 * 60 * 60
+PRICE_TOLERANCE = 0.05
+BUYING_POWER_TOLERANCE = 0.05
+FUNCTIONS = {
+    "order_sell_fractional_by_quantity": "sell",
+    "order_sell_fractional_by_price": "sell",
+    "order_buy_fractional_by_price": "buy"
+}
+
+
+def _price(value):
+    return float(value) if value and math.isfinite(value) else None
+
+
+def _entry(order, function, value, price, message):
+    return {"symbol": order.symbol, "side": FUNCTIONS[function], "function": function, "value": value, "amount": order.amount, "price": _price(price), "message": message}
+
+
+def entries(plan, prices):
+    # Sells first, then buys, each named after the robin_stocks function that places it.
+    from . import planner
+
+    sells = []
+    for order in plan.sells:
+        if order.action == planner.EXIT:
+            sells.append(_entry(order, "order_sell_fractional_by_quantity", order.shares, prices.get(order.symbol), f"Selling ${order.amount:.2f} of {order.symbol}."))
+        else:
+            sells.append(_entry(order, "order_sell_fractional_by_price", order.amount, prices.get(order.symbol), f"Selling ${order.amount:.2f} from {order.symbol} to adjust to ${order.target:.2f}"))
+
+    buys = []
+    for order in plan.buys:
+        if not order.current:
+            buys.append(_entry(order, "order_buy_fractional_by_price", order.amount, prices.get(order.symbol), f"Investing ${order.amount:.2f} in {order.symbol}"))
+        else:
+            buys.append(_entry(order, "order_buy_fractional_by_price", order.amount, prices.get(order.symbol), f"Buying ${order.amount:.2f} from {order.symbol} to adjust to ${order.target:.2f}"))
+
+    return sells + buys
+
+
+def create(plan, prices, account, weights, expiry=EXPIRY, price_tolerance=PRICE_TOLERANCE, buying_power_tolerance=BUYING_POWER_TOLERANCE, max_order=None, now=None, margin_ratios=None):
+    now = time.time() if now is None else now
+    margin_ratios = margin_ratios or {}
+
+    # The planner's sizing rule, the one rebalance_old places orders with: each target is buying power plus portfolio
+    # value, times the weight, divided by the symbol's margin ratio. No buy is larger than its target, so the targets
+    # bound both the largest order and all buys together. Sells are bounded by the portfolio value.
+    targets = [(account.buying_power + account.portfolio_value) * weight / margin_ratios.get(symbol, 1.0) for symbol, weight in weights.items()]
+
+    data = {
+        "version": VERSION,
+        "created_at": tracker.timestamp(now),
+        "expires_at": tracker.timestamp(now + expiry),
+        "account_number": account.account_profile.get("account_number"),
+        "buying_power": account.buying_power,
+        "portfolio_value": account.portfolio_value,
+        "weights": dict(weights),
+        "tolerances": {"price": price_tolerance, "buying_power": buying_power_tolerance},
+        "bounds": {"max_order": max([account.portfolio_value] + targets) if max_order is None else max_order, "max_buys": sum(targets)},
+        "orders": entries(plan, prices)
+    }
+
+    validate(data, now)
+    return data
+
+
+def validate(data, now=None):
+    if data.get("version") != VERSION:
+        raise Exception(f"Plan version {data.get('version')} is not supported. Run 'ropoma plan' again.")
+
+    if data.get("executed_at"):
+        raise Exception(f"Plan already executed at {data['executed_at']}. Run 'ropoma plan' again.")
+
+    if (time.time() if now is None else now) >= tracker.parse_timestamp(data["expires_at"]):
+        raise Exception(f"Plan expired at {data['expires_at']}. Run 'ropoma plan' again.")
+
+    problems = []
+    bounds = data["bounds"]
+    weights = data["weights"].values()
+
+    # Same rounding as the allocation file check, which accepts any total that rounds to 100%.
+    if any(weight < 0 for weight in weights) or round(sum(weights), 2) > 1:
+        problems.append(f"Target weights add up to {sum(weights) * 100:.2f}%.")
+
+    for entry in data["orders"]:
+        if FUNCTIONS.get(entry["function"]) != entry["side"]:
+            problems.append(f"Unknown order {entry['function']} for {entry['symbol']}.")
+        if not (isinstance(entry["value"], (int, float)) and math.isfinite(entry["value"]) and entry["value"] > 0):
+            problems.append(f"Invalid {entry['side']} of {entry['value']} for {entry['symbol']}.")
+        if not entry["price"] or entry["price"] <= 0:
+            problems.append(f"No price for {entry['symbol']}.")
+        if entry["amount"] > bounds["max_order"]:
+            problems.append(f"{entry['side'].capitalize()} of ${entry['amount']:.2f} in {entry['symbol']} is above the ${bounds['max_order']:.2f} limit per order.")
+
+    buys = sum(entry["amount"] for entry in data["orders"] if entry["side"] == "buy")
+    if buys > bounds["max_buys"] + 0.01:
+        problems.append(f"Buys add up to ${buys:.2f}, above the ${bounds['max_buys']:.2f} the account can fund.")
+
+    if problems:
+        raise Exception("Invalid plan. " + " ".join(problems))
+
+
+def check(data, account_number, buying_power, prices):
+    # The last look before orders go out: the same account, enough buying power and prices close to the planned ones.
+    problems = []
+    tolerances = data["tolerances"]
+
+    if data["account_number"] and account_number != data["account_number"]:
+        problems.append(f"Plan was made for account {data['account_number']}, logged in to {account_number}.")
+
+    if buying_power < data["buying_power"] * (1 - tolerances["buying_power"]):
+        problems.append(f"Buying power ${buying_power:.2f} is more than {tolerances['buying_power'] * 100:.2f}% below the planned ${data['buying_power']:.2f}.")
+
+    for symbol, planned in {entry["symbol"]: entry["price"] for entry in data["orders"]}.items():
+        price = prices.get(symbol)
+
+        if not price:
+            problems.append(f"No quote for {symbol}.")
+        elif abs(price / planned - 1) > tolerances["price"]:
+            problems.append(f"{symbol} moved {(price / planned - 1) * 100:+.2f}% since the plan (${planned:.2f} to ${price:.2f}).")
+
+    return problems
+
+
+def save(data, path):
+    path = pathlib.Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+
+    with open(temporary, "w") as file:
+        json.dump(data, file, indent=2)
+
+    os.replace(temporary, path)
+    return path
+
+
+def load(path, now=None):
+    path = pathlib.Path(path)
+
+    if not path.is_file():
+        raise Exception(f"Plan file {path} not found. Run 'ropoma plan' first.")
+
+    with open(path, "r") as file:
+        data = json.load(file)
+
+    validate(data, now)
+    return data
+
+
+def mark_executed(data, path, now=None):
+    # Recorded before the first order goes out, so a plan is never executed twice, even after a crash.
+    data["executed_at"] = tracker.timestamp(time.time() if now is None else now)
+    save(data, path)
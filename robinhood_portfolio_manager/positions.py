@@ -0,0 +1,106 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import collections.abc
+import numpy as np
+
+
+def _readonly(values):
+    array = np.array(values, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+class Positions(collections.abc.Mapping):
+
+    # One array per field instead of one dict per symbol. Reading positions[symbol] still returns the dictionary
+    # get_current_investments used to return, so existing callers keep working.
+    __slots__ = ("symbols", "available_shares", "collateral_shares", "prices", "equity", "market_value", "_index")
+
+    def __init__(self, symbols=(), available_shares=(), collateral_shares=(), prices=(), market_value=None):
+        self.symbols = tuple(symbols)
+        self.available_shares = _readonly(available_shares)
+        self.collateral_shares = _readonly(collateral_shares)
+        self.prices = _readonly(prices)
+        self.equity = _readonly(self.prices * (self.available_shares + self.collateral_shares))
+        self.market_value = float(self.equity.sum() if market_value is None else market_value)
+        self._index = None
+
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {symbol: position for position, symbol in enumerate(self.symbols)}
+
+        return self._index
+
+
+    def __getitem__(self, symbol):
+        position = self.index[symbol]
+        equity = float(self.equity[position])
+        return {
+            "equity": equity,
+            "percentage": round(equity / self.market_value * 100, 2) if self.market_value else 0.0,
+            "available_shares": float(self.available_shares[position]),
+            "collateral_shares": float(self.collateral_shares[position]),
+            "price": float(self.prices[position])
+        }
+
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+
+    def __repr__(self):
+        return f"Positions({len(self)} symbols, ${self.total_equity:.2f})"
+
+
+    @property
+    def total_equity(self):
+        return float(self.equity.sum())
+
+
+    @property
+    def weights(self):
+        return self.equity / self.market_value if self.market_value else np.zeros(len(self))
+
+
+    @property
+    def percentages(self):
+        return np.round(self.weights * 100, 2)
+
+
+    @property
+    def collateral_mask(self):
+        return self.collateral_shares > 0
+
+
+    @property
+    def has_collateral(self):
+        return bool(self.collateral_mask.any())
+
+
+    def take(self, symbols):
+        # Row of each symbol, -1 for symbols that aren't held.
+        index = self.index
+        return np.fromiter((index.get(symbol, -1) for symbol in symbols), dtype=np.int64, count=len(symbols))
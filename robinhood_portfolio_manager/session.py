@@ -0,0 +1,160 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import os
+import json
+import time
+import base64
+import pickle
+import hashlib
+import tempfile
+from . import utils
+
+
+ITERATIONS = 200000
+CLIENT_ID = "c82SH0WZOsabOXGP2sxqcj34FxkvfnWRZBKlBjFS"
+# Tokens closer than this to expiring are refreshed before they are reused.
+REFRESH_MARGIN = 60 * 60
+
+
+class SessionStore(object):
+
+    def __init__(self, username, password, path=None):
+        self.username = username
+        self.password = password
+        self.path = path or utils.get_file(f"Robinhood.{hashlib.sha256(username.encode()).hexdigest()[:12]}.session")
+
+
+    def _fernet(self, salt):
+        from cryptography.fernet import Fernet
+
+        key = hashlib.pbkdf2_hmac("sha256", f"{self.username}:{self.password}".encode(), salt, ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+
+    def load(self):
+        if not self.path.is_file():
+            return None
+
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+
+            salt = base64.b64decode(data["salt"])
+            return json.loads(self._fernet(salt).decrypt(data["token"].encode()))
+        except Exception:
+            return None
+
+
+    def save(self, tokens):
+        salt = os.urandom(16)
+        token = self._fernet(salt).encrypt(json.dumps(tokens).encode()).decode()
+
+        with open(self.path, "w") as file:
+            json.dump({"salt": base64.b64encode(salt).decode(), "token": token}, file)
+
+        os.chmod(self.path, 0o600)
+
+
+    def clear(self):
+        if self.path.is_file():
+            self.path.unlink()
+
+
+def is_fresh(tokens, margin=0):
+    return bool(tokens and tokens.get("access_token")) and tokens.get("expires_at", 0) - margin > time.time()
+
+
+def restore(backend, tokens):
+    backend.helper.update_session("Authorization", f"{tokens['token_type']} {tokens['access_token']}")
+    backend.helper.set_login_state(True)
+
+
+def is_valid(backend, tokens):
+    # The check robin_stocks makes before it reuses a pickled token: a revoked token can't read a page of positions.
+    restore(backend, tokens)
+
+    try:
+        valid = backend.helper.request_get(backend.urls.positions_url(), "regular", {"nonzero": "true"}) is not None
+    except Exception:
+        valid = False
+
+    if not valid:
+        backend.helper.update_session("Authorization", None)
+        backend.helper.set_login_state(False)
+
+    return valid
+
+
+def login(backend, username, password, mfa_code):
+    # robin_stocks 3.x only returns the tokens, the refresh token included, when it stores them in its pickle file,
+    # so they are stored in a temporary directory of our own that is removed right away.
+    with tempfile.TemporaryDirectory() as directory:
+        data = backend.authentication.login(username, password, store_session=True, mfa_code=mfa_code, pickle_path=directory)
+        path = os.path.join(directory, "robinhood.pickle")
+        device_token = None
+
+        if os.path.isfile(path):
+            with open(path, "rb") as file:
+                device_token = pickle.load(file).get("device_token")
+
+    return from_backend(backend, data, device_token), data
+
+
+def refresh(backend, tokens):
+    if not tokens or not tokens.get("refresh_token"):
+        return None
+
+    payload = {
+        "grant_type": "refresh_token",
+        "refresh_token": tokens["refresh_token"],
+        "client_id": CLIENT_ID,
+        "scope": tokens.get("scope", "internal"),
+        "expires_in": 86400
+    }
+
+    if tokens.get("device_token"):
+        payload["device_token"] = tokens["device_token"]
+
+    data = backend.helper.request_post(backend.urls.login_url(), payload)
+    if not data or "access_token" not in data:
+        return None
+
+    return to_tokens(data, tokens.get("device_token"))
+
+
+def to_tokens(data, device_token=None):
+    return {
+        "token_type": data.get("token_type", "Bearer"),
+        "access_token": data["access_token"],
+        "refresh_token": data.get("refresh_token"),
+        "scope": data.get("scope", "internal"),
+        "device_token": device_token,
+        "expires_at": time.time() + float(data.get("expires_in", 86400))
+    }
+
+
+def from_backend(backend, data, device_token=None):
+    # Backends that return nothing from login() leave the token in the session header only, with no refresh token.
+    if data and data.get("access_token"):
+        return to_tokens(data, device_token)
+
+    session = getattr(backend.helper, "SESSION", None)
+    authorization = session.headers.get("Authorization") if session is not None else None
+    if not authorization:
+        return None
+
+    token_type, _, access_token = authorization.partition(" ")
+    return to_tokens({"token_type": token_type, "access_token": access_token})
@@ -0,0 +1,85 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import time
+import types
+import collections
+import concurrent.futures
+
+
+def _freeze(data):
+    if isinstance(data, dict):
+        return types.MappingProxyType({key: _freeze(value) for key, value in data.items()})
+
+    if isinstance(data, list):
+        return tuple(_freeze(item) for item in data)
+
+    return data
+
+
+class AccountSnapshot(collections.namedtuple("AccountSnapshot", ["account_profile", "portfolio_profile", "positions", "watchlist", "fetched_at"])):
+
+    __slots__ = ()
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+    @property
+    def buying_power(self):
+        return float(self.account_profile["buying_power"])
+
+
+    @property
+    def account_type(self):
+        return self.account_profile["type"].lower()
+
+
+    @property
+    def equity(self):
+        return float(self.portfolio_profile.get("extended_hours_portfolio_equity") or self.portfolio_profile["equity"])
+
+
+    @property
+    def market_value(self):
+        return float(self.portfolio_profile.get("extended_hours_market_value") or self.portfolio_profile["market_value"])
+
+
+    @property
+    def portfolio_value(self):
+        return self.equity + self.buying_power
+
+
+    @property
+    def watchlist_symbols(self):
+        return [instrument["symbol"] for instrument in self.watchlist["results"]] if self.watchlist else []
+
+
+def fetch(backend, watchlist="Portfolio"):
+    # The four reads are independent, so they are sent together and the snapshot costs one round trip of wall time.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        account_profile = executor.submit(backend.profiles.load_account_profile)
+        portfolio_profile = executor.submit(backend.profiles.load_portfolio_profile)
+        positions = executor.submit(backend.account.get_open_stock_positions)
+        portfolio = executor.submit(backend.account.get_watchlist_by_name, watchlist)
+
+    return AccountSnapshot(
+        _freeze(account_profile.result()),
+        _freeze(portfolio_profile.result()),
+        _freeze(positions.result() or []),
+        _freeze(portfolio.result() or {}),
+        time.time()
+    )
@@ -0,0 +1,161 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import time
+import datetime
+import threading
+import concurrent.futures
+
+
+TERMINAL_STATES = ("filled", "cancelled", "rejected", "failed")
+# Orders placed while the market is closed wait for the open in this state.
+QUEUED = "queued"
+
+
+def timestamp(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def parse_timestamp(value):
+    value = value.replace("Z", "+00:00")
+
+    for pattern in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return datetime.datetime.strptime(value, pattern).timestamp()
+        except ValueError:
+            pass
+
+    raise ValueError(f"Unknown timestamp {value}.")
+
+
+def proceeds(order):
+    return float(order.get("cumulative_quantity") or 0) * float(order.get("average_price") or 0)
+
+
+def fetch_orders(backend, since):
+    # One request returns every order updated since the given time, whatever the number of orders being followed.
+    # A failed page comes back as None.
+    orders = backend.helper.request_get(backend.urls.orders_url(), "pagination", {"updated_at[gte]": timestamp(since)})
+    return [order for order in orders or [] if order]
+
+
+class OrderTracker(object):
+
+    def __init__(self, backend, min_interval=0.5, max_interval=10.0, backoff=1.5):
+        self.backend = backend
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.futures = {}
+        self.orders = {}
+        self.submitted = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.polls = 0
+
+
+    def track(self, order):
+        with self.lock:
+            if order["id"] in self.futures:
+                return self.futures[order["id"]]
+
+            future = concurrent.futures.Future()
+            self.futures[order["id"]] = future
+            self.orders[order["id"]] = order
+            # Leave a minute of slack for clock skew between this machine and Robinhood.
+            self.submitted[order["id"]] = time.time() - 60
+
+            if order.get("state") in TERMINAL_STATES:
+                future.set_result(order)
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="OrderTracker", daemon=True)
+                self.thread.start()
+            else:
+                self.wakeup.set()
+
+        return future
+
+
+    @property
+    def pending(self):
+        with self.lock:
+            return [order_id for order_id, future in self.futures.items() if not future.done()]
+
+
+    def poll(self):
+        with self.lock:
+            # Only orders still pending decide how far back to look, so a long-lived tracker keeps its requests small.
+            since = min((self.submitted[order_id] for order_id, future in self.futures.items() if not future.done()), default=time.time() - 60)
+
+        self.polls += 1
+        changed = False
+
+        for order in fetch_orders(self.backend, since):
+            with self.lock:
+                future = self.futures.get(order["id"])
+                if future is None or future.done():
+                    continue
+
+                if order.get("state") != self.orders[order["id"]].get("state"):
+                    changed = True
+
+                self.orders[order["id"]] = order
+
+            if order.get("state") in TERMINAL_STATES:
+                future.set_result(order)
+
+        return changed
+
+
+    def _run(self):
+        interval = self.min_interval
+
+        while True:
+            with self.lock:
+                # Decided under the lock: an order tracked after this finds no thread and starts a new one.
+                if all(future.done() for future in self.futures.values()):
+                    self.thread = None
+                    return
+
+            try:
+                changed = self.poll()
+            except Exception:
+                changed = False
+
+            # Poll quickly while orders are moving and back off while nothing changes.
+            interval = self.min_interval if changed else min(self.max_interval, interval * self.backoff)
+            self.wakeup.wait(interval)
+
+            if self.wakeup.is_set():
+                self.wakeup.clear()
+                interval = self.min_interval
+
+
+    def queued(self):
+        with self.lock:
+            return [order_id for order_id, future in self.futures.items() if not future.done() and self.orders[order_id].get("state") == QUEUED]
+
+
+    def wait(self, futures=None, timeout=None, skip_queued=False):
+        with self.lock:
+            futures = list(self.futures.values()) if futures is None else futures
+
+        if skip_queued:
+            queued = {id(self.futures[order_id]) for order_id in self.queued()}
+            futures = [future for future in futures if id(future) not in queued]
+
+        return concurrent.futures.wait(futures, timeout=timeout)
@@ -0,0 +1,24 @@
+################################################################################################################
+# A python CLI that allows a Robinhood user to easily allocate and divide his capital on different stocks.
+################################################################################################################
+# Author: Mina Messiah
+# Copyright: Copyright 2021, robinhood-portfolio-manager
+# License: MIT License
+# Version: 0.0b10
+# Date: 02-25-2021
+# Email: mena.sb.109@gmail.com
+# URLs: pypi.org/project/robinhood-portfolio-manager &
+# github.com/MinaMessiah/robinhood_portfolio_manager
+# Status: In development
+################################################################################################################
+
+
+import pathlib
+import platform
+
+
+def get_file(name):
+    if platform.system().lower() == "windows":
+        return pathlib.Path.home().joinpath("Documents", name)
+
+    return pathlib.Path.home().joinpath(name)